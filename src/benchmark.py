@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+## benchmark.py file generates synthetic LoanStats-shaped .csv files from schema .txt files and times the csv_to_parquet library on them so throughput and memory can be compared across runs
+from csv_to_parquet import csv_to_parquet, get_compiled_schema, DataType, PipelineMetrics, get_peak_rss_bytes
+import numpy as np
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import subprocess
+import sys
+import argparse
+import platform
+import hashlib
+import json
+import time
+import csv
+import os
+
+BENCHMARK_SCHEMA = 'LoanStats_securev1_2018Q4 - Developer Supplied Schema.txt' ## The schema .txt file the synthetic columns are taken from
+BENCHMARK_FOLDER = '../benchmark_files/' ## The generated .csv and schema .txt files (and their .parquet files) are written to this folder
+RESULTS_FILE = BENCHMARK_FOLDER + 'results.jsonl' ## Every run of a case is appended to this file as one JSON line
+GENERATION_BLOCK_SIZE = 10000 ## Number of rows generated and written at a time
+DATE_RANGE_START = date(2007, 1, 1)
+DATE_RANGE_DAYS = 4383 ## 2007-01-01 to 2018-12-31, the range of the LoanStats dates
+DATE_STYLES = {'Mon-YY': '%b-%y', 'YY-Mon': '%y-%b', 'YYYY-MM-DD': '%Y-%m-%d', 'MM/DD/YYYY': '%m/%d/%Y', 'YYYYMMDD': '%Y%m%d'} ## The date formats a Date column can be generated in; 'mixed' picks one of these for every value
+STRING_VALUES = np.array(['Driver', 'Manager', 'Teacher', 'Registered Nurse', 'Owner', 'Sales', 'Supervisor', 'Project Manager', 'Office Manager', 'General Manager', 'Director', 'Engineer', 'Truck Driver', 'Police Officer', 'President', 'Current', 'Fully Paid', 'Charged Off', ' 36 months', ' 60 months', 'A', 'B', 'C', 'D', 'E', 'F', 'G', 'IL', 'TX', 'CA', 'NY', 'FL', 'N', 'Y'], dtype=object) ## The values of String columns are picked from these
+INVALID_VALUES = {DataType.INTEGER: 'n/a', DataType.DOUBLE: '12.5.1', DataType.DATE: 'not a date'} ## The values that are not aligned with the schema; String columns accept every value so they never get invalid values
+DEFAULT_CASE = {'rows': 100000, 'columns': 150, 'null_ratio': 0.1, 'date_format': 'Mon-YY', 'junk_header_lines': 1, 'junk_footer_lines': 2, 'invalid_ratio': 0.0, 'seed': 0, 'schema': BENCHMARK_SCHEMA, 'options': {}} ## A case is the shape of the generated data plus the keyword arguments (options) passed to csv_to_parquet
+
+## write_benchmark_schema takes in a schema .txt file, the number of columns, and the path of the new schema .txt file and writes the first columns of the schema .txt file to the new one; if more columns are asked for than the schema has, its columns are repeated with a suffix (e.g. loan_amnt_2)
+def write_benchmark_schema(schema_txt, columns, path):
+    with open(schema_txt) as schema_file:
+        schema_lines = [line.strip() for line in schema_file.readlines() if line.strip()]
+    column_lines = []
+    for i in range(columns):
+        line = schema_lines[1:][i % len(schema_lines[1:])].split(' ')
+        if i >= len(schema_lines[1:]):
+            line[0] = line[0] + '_' + str(i // len(schema_lines[1:]) + 1)
+        column_lines.append(' '.join(line))
+    with open(path, 'w', newline='') as schema_file:
+        schema_file.write('\r\n'.join([schema_lines[0]] + column_lines)) ## Same layout as the developer supplied schema .txt files
+
+## generate_csv takes in the path of the .csv file, the schema .txt file, the number of rows, and the shape of the data and writes a LoanStats-shaped .csv file: junk lines before the header, a quoted header, the rows, and a blank line followed by junk lines after the rows
+def generate_csv(path, schema_txt, rows, null_ratio=0.1, date_format='Mon-YY', junk_header_lines=1, junk_footer_lines=2, invalid_ratio=0.0, seed=0):
+    schema = get_compiled_schema(schema_txt)
+    rng = np.random.default_rng(seed) ## Seeded so the same case always generates the same file
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file, quoting=csv.QUOTE_ALL)
+        for i in range(junk_header_lines):
+            csv_file.write('Notes offered by Prospectus (https://www.lendingclub.com/info/prospectus.action)' + (' ' + str(i + 1) if i else '') + '\n')
+        writer.writerow(list(schema))
+        for start in range(0, rows, GENERATION_BLOCK_SIZE):
+            block_rows = min(GENERATION_BLOCK_SIZE, rows - start)
+            block = [generate_column_values(rng, column_spec, block_rows, null_ratio, date_format, invalid_ratio) for column_spec in schema.values()]
+            writer.writerows(zip(*block))
+        if junk_footer_lines:
+            csv_file.write('\n')
+        for i in range(junk_footer_lines):
+            csv_file.write('Total amount funded in policy code ' + str(i + 1) + ': ' + str(int(rng.integers(0, 10**9))) + '\n')
+
+## generate_column_values takes in the random generator, the ColumnSpec of the column, the number of rows, and the shape of the data and returns the values of the column as strings; only nullable columns get empty values and only non-String columns get invalid values
+def generate_column_values(rng, column_spec, rows, null_ratio, date_format, invalid_ratio):
+    if column_spec.data_type == DataType.INTEGER:
+        values = rng.integers(0, 100000, rows).astype(str).astype(object)
+    elif column_spec.data_type == DataType.DOUBLE:
+        values = np.char.mod('%.2f', rng.uniform(0, 10000, rows)).astype(object)
+    elif column_spec.data_type == DataType.STRING:
+        values = rng.choice(STRING_VALUES, rows)
+    else:
+        values = rng.choice(get_date_values(date_format if column_spec.date_standardization else 'YYYY-MM-DD'), rows) ## Date columns without date standardization are already in ISO format
+    if column_spec.nullable and null_ratio:
+        values[rng.random(rows) < null_ratio] = ''
+    if column_spec.data_type in INVALID_VALUES and invalid_ratio:
+        values[rng.random(rows) < invalid_ratio] = INVALID_VALUES[column_spec.data_type]
+    return values
+
+## get_date_values takes in a date format from DATE_STYLES (or 'mixed') and returns every date of the LoanStats range in that format
+def get_date_values(date_format):
+    if date_format == 'mixed':
+        return np.concatenate([get_date_values(i) for i in DATE_STYLES])
+    if date_format not in DATE_STYLES:
+        raise ValueError("date_format has to be one of " + ", ".join(list(DATE_STYLES) + ['mixed']))
+    return np.array([(DATE_RANGE_START + timedelta(days=i)).strftime(DATE_STYLES[date_format]) for i in range(DATE_RANGE_DAYS)], dtype=object)
+
+## get_case makes a case from DEFAULT_CASE and the given changes (e.g. rows=10**6, options={'streaming': True})
+def get_case(**changes):
+    case = dict(DEFAULT_CASE)
+    case.update(changes)
+    return case
+
+## get_case_files takes in a case and the benchmark folder and returns the .csv file and schema .txt file of the case, generating them if they have not been generated yet; the file names include a hash of the data shape so a generated file is reused by every run (and every options) with the same shape
+def get_case_files(case, folder=BENCHMARK_FOLDER):
+    shape = {i: case[i] for i in case if i != 'options'}
+    name = 'Benchmark - ' + str(case['rows']) + ' rows - ' + str(case['columns']) + ' columns - ' + hashlib.sha256(json.dumps(shape, sort_keys=True).encode()).hexdigest()[:12]
+    csv_path = os.path.join(folder, name + '.csv')
+    schema_path = os.path.join(folder, name + ' - Schema.txt')
+    if not os.path.isfile(csv_path) or not os.path.isfile(schema_path):
+        os.makedirs(folder, exist_ok=True)
+        write_benchmark_schema(case['schema'], case['columns'], schema_path)
+        generate_csv(csv_path + '.tmp', schema_path, case['rows'], case['null_ratio'], case['date_format'], case['junk_header_lines'], case['junk_footer_lines'], case['invalid_ratio'], case['seed'])
+        os.replace(csv_path + '.tmp', csv_path) ## A generation that was stopped part way through is not reused
+    return csv_path, schema_path
+
+## run_case takes in a case and the benchmark folder, runs csv_to_parquet on the case's files in this process, and returns the measurements of the run
+def run_case(case, folder=BENCHMARK_FOLDER):
+    csv_path, schema_path = get_case_files(case, folder)
+    metrics = PipelineMetrics()
+    start = time.perf_counter()
+    result = csv_to_parquet([[csv_path, schema_path]], metrics=metrics, **case['options'])
+    wall_seconds = time.perf_counter() - start
+    file_metrics = metrics.files[0]
+    peak_rss_bytes = [i for i in [get_peak_rss_bytes(), file_metrics.peak_rss_bytes] if i is not None] ## With workers, the file is processed in a child process that has its own peak memory
+    return {'succeeded': result[0] is not None,
+            'wall_seconds': wall_seconds,
+            'rows_per_second': case['rows'] / wall_seconds,
+            'megabytes_per_second': file_metrics.bytes_in / wall_seconds / 10**6,
+            'rows_in': file_metrics.rows_in,
+            'rows_out': file_metrics.rows_out,
+            'bytes_in': file_metrics.bytes_in,
+            'bytes_out': file_metrics.bytes_out,
+            'stage_seconds': file_metrics.stage_seconds,
+            'peak_rss_bytes': max(peak_rss_bytes) if peak_rss_bytes else None}
+
+## run_benchmark takes in a list of cases, the number of times each case is run, the results file, the label of the runs (e.g. a commit or branch), the benchmark folder, and whether each run is isolated in a new process; it appends one JSON line per run to the results file and returns the runs
+def run_benchmark(cases, repeats=3, results_file=RESULTS_FILE, label=None, folder=BENCHMARK_FOLDER, isolate=True):
+    label = label or time.strftime('%Y-%m-%dT%H:%M:%S')
+    runs = []
+    for case in cases:
+        get_case_files(case, folder) ## Generating the data up front so it is not part of the timed runs or their peak memory
+        for repeat in range(repeats):
+            if isolate: ## A new process for every run so the peak memory and the caches of one run do not carry over to the next
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                    measurements = executor.submit(run_case, case, folder).result()
+            else:
+                measurements = run_case(case, folder)
+            run = {'label': label, 'timestamp': time.time(), 'host': platform.node(), 'python': platform.python_version(), 'cpu_count': os.cpu_count(), 'case': case, 'repeat': repeat}
+            run.update(measurements)
+            runs.append(run)
+            os.makedirs(os.path.dirname(results_file) or '.', exist_ok=True)
+            with open(results_file, 'a') as results:
+                results.write(json.dumps(run) + '\n')
+    return runs
+
+## measure_startup takes in whether Spark is started too and returns, from a new Python process, the seconds it took to import csv_to_parquet, to import the dependencies (and start Spark) the first time (cold start), and to do it again with the same ConversionSession (warm start)
+def measure_startup(spark=False):
+    script = ("import json, time\n"
+              "start = time.perf_counter()\n"
+              "import csv_to_parquet\n"
+              "import_seconds = time.perf_counter() - start\n"
+              "session = csv_to_parquet.ConversionSession()\n"
+              "start = time.perf_counter()\n"
+              "startup_seconds = session.warm_up(" + str(spark) + ")\n"
+              "cold_start_seconds = time.perf_counter() - start\n"
+              "start = time.perf_counter()\n"
+              "session.warm_up(" + str(spark) + ")\n"
+              "warm_start_seconds = time.perf_counter() - start\n"
+              "session.stop()\n"
+              "print(json.dumps({'import_seconds': import_seconds, 'cold_start_seconds': cold_start_seconds, 'warm_start_seconds': warm_start_seconds, 'startup_seconds': startup_seconds}))\n")
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))) ## A new process, so nothing has been imported yet
+    return json.loads(output.stdout.splitlines()[-1])
+
+## compare_results takes in the results file, the label of the baseline runs, the label of the new runs, and the slowdown that counts as a regression and returns, for every case run under both labels, the median rows per second and peak memory of each label and whether the new runs regressed
+def compare_results(results_file, baseline_label, label, threshold=0.1):
+    runs = {}
+    with open(results_file) as results:
+        for line in results:
+            run = json.loads(line)
+            if run['label'] in (baseline_label, label) and run['succeeded']:
+                runs.setdefault(json.dumps(run['case'], sort_keys=True), {}).setdefault(run['label'], []).append(run)
+    comparison = []
+    for case, case_runs in runs.items():
+        if baseline_label not in case_runs or label not in case_runs:
+            continue
+        baseline_speed = float(np.median([i['rows_per_second'] for i in case_runs[baseline_label]]))
+        speed = float(np.median([i['rows_per_second'] for i in case_runs[label]]))
+        comparison.append({'case': json.loads(case),
+                           'baseline_rows_per_second': baseline_speed,
+                           'rows_per_second': speed,
+                           'speedup': speed / baseline_speed,
+                           'baseline_peak_rss_bytes': max([i['peak_rss_bytes'] or 0 for i in case_runs[baseline_label]]),
+                           'peak_rss_bytes': max([i['peak_rss_bytes'] or 0 for i in case_runs[label]]),
+                           'regression': speed < baseline_speed * (1 - threshold)})
+    return comparison
+
+if __name__ == '__main__':
+    ## e.g. python benchmark.py --rows 100000 1000000 --columns 10 150 --label before
+    ##      python benchmark.py --compare before after
+    ##      python benchmark.py --startup --options '{"engine": "spark"}'
+    parser = argparse.ArgumentParser(description='Times csv_to_parquet on synthetic LoanStats-shaped .csv files')
+    parser.add_argument('--rows', type=int, nargs='+', default=[DEFAULT_CASE['rows']])
+    parser.add_argument('--columns', type=int, nargs='+', default=[DEFAULT_CASE['columns']])
+    parser.add_argument('--null-ratio', type=float, default=DEFAULT_CASE['null_ratio'])
+    parser.add_argument('--date-format', default=DEFAULT_CASE['date_format'], choices=list(DATE_STYLES) + ['mixed'])
+    parser.add_argument('--junk-header-lines', type=int, default=DEFAULT_CASE['junk_header_lines'])
+    parser.add_argument('--junk-footer-lines', type=int, default=DEFAULT_CASE['junk_footer_lines'])
+    parser.add_argument('--invalid-ratio', type=float, default=DEFAULT_CASE['invalid_ratio'])
+    parser.add_argument('--schema', default=DEFAULT_CASE['schema'])
+    parser.add_argument('--options', type=json.loads, default={}, help='csv_to_parquet keyword arguments as JSON, e.g. \'{"streaming": true}\'')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--label')
+    parser.add_argument('--results', default=RESULTS_FILE)
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE_LABEL', 'LABEL'))
+    parser.add_argument('--startup', action='store_true', help='times the import of csv_to_parquet and the cold and warm start of its dependencies (and of Spark, if the options use the spark engine or reader)')
+    args = parser.parse_args()
+    if args.startup:
+        startup = measure_startup(args.options.get('engine') == 'spark' or args.options.get('reader') == 'spark')
+        print("import: %.3f s, cold start: %.3f s, warm start: %.3f s, %s" % (startup['import_seconds'], startup['cold_start_seconds'], startup['warm_start_seconds'], json.dumps({i: round(j, 3) for i, j in startup['startup_seconds'].items()})))
+    elif args.compare:
+        for i in compare_results(args.results, args.compare[0], args.compare[1]):
+            print(json.dumps(i['case']))
+            print("    rows/sec: %.0f -> %.0f (x%.2f)%s, peak memory: %.1f MB -> %.1f MB" % (i['baseline_rows_per_second'], i['rows_per_second'], i['speedup'], " REGRESSION" if i['regression'] else "", i['baseline_peak_rss_bytes'] / 10**6, i['peak_rss_bytes'] / 10**6))
+    else:
+        cases = [get_case(rows=rows, columns=columns, null_ratio=args.null_ratio, date_format=args.date_format, junk_header_lines=args.junk_header_lines, junk_footer_lines=args.junk_footer_lines, invalid_ratio=args.invalid_ratio, schema=args.schema, options=args.options) for rows in args.rows for columns in args.columns]
+        for run in run_benchmark(cases, args.repeats, args.results, args.label):
+            print("%s rows, %s columns, run %d: %s, %.2f s, %.0f rows/sec, peak memory %.1f MB, stages %s" % (run['case']['rows'], run['case']['columns'], run['repeat'] + 1, "succeeded" if run['succeeded'] else "failed", run['wall_seconds'], run['rows_per_second'], (run['peak_rss_bytes'] or 0) / 10**6, json.dumps({i: round(j, 3) for i, j in run['stage_seconds'].items()})))
@@ -2,81 +2,1465 @@
 ## csv_to_parquet.py file has the code that reads, processes, and transforms CSV files and uploads them to Parquet tables
 import warnings
 warnings.filterwarnings("ignore")
-from pyspark.sql import SparkSession
-import pandas as pd
-from datetime import datetime
+import importlib
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from datetime import datetime, date
 import os
+import errno
+import shutil
 import csv
 import re
-from dateutil.parser import parse
 import calendar
+import io
+import json
+import hashlib
+import glob
+import random
+import operator
+import queue
+import threading
+import atexit
+import urllib.request
+import urllib.parse
+from functools import lru_cache
+from enum import Enum
+from contextlib import contextmanager
+import time
+import sys
+try:
+    import resource ## resource is only available on Unix; the peak memory is not recorded without it
+except ImportError:
+    resource = None
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
 
-## csv_to_parquet reads in a multidimensional list and returns a list where each index is either a DataFrame object or None
-def csv_to_parquet(files_list): ## files_list is a list where each index contains another list where the 0th index is a .csv file and the 1st index is a .txt file for the csv's schema
+## LazyModule stands in for a module that is slow to import; the module is only imported the first time one of its attributes is used, so importing csv_to_parquet does not pay for the backends a run never uses
+class LazyModule:
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def load(self):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return self.module
+
+    def __getattr__(self, name):
+        if name in ('name', 'module'): ## Needed so copying or unpickling a LazyModule does not recurse
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+pyspark_sql = LazyModule('pyspark.sql') ## pyspark (and the JVM) is only needed by the 'spark' engine and the 'spark' reader
+F = LazyModule('pyspark.sql.functions')
+pyspark = LazyModule('pyspark')
+pd = LazyModule('pandas') ## pandas is needed to convert columns and to build DataFrames, but not to import the library
+ds = LazyModule('pyarrow.dataset') ## pyarrow.dataset imports pandas, and is only used to count the rows of .parquet files
+dateutil_parser = LazyModule('dateutil.parser') ## dateutil only parses the dates that none of the DATE_FORMATS match
+
+NUMERIC_PATTERN = r'^[-+]?[0-9]*\.?[0-9]+$' ## Values of Double and Integer columns have to match this pattern
+DATE_CACHE_SIZE = 65536 ## Maximum number of distinct date strings whose standardized value is kept in memory
+DATE_FORMAT_SAMPLE_SIZE = 1000 ## Number of distinct values of a Date column used to detect the column's dominant date format
+MONTH_ABBREVIATIONS = '|'.join(calendar.month_abbr[1:])
+STREAMING_CHUNK_SIZE = 100000 ## Number of csv rows that are read, converted, and written as one row group at a time in streaming mode
+HASH_BLOCK_SIZE = 1024*1024 ## Number of bytes read at a time when hashing a csv file
+MEMORY_PER_CSV_BYTE = 8 ## Rough peak memory used for every byte of csv data that is in memory (raw rows, Arrow tables, and the returned DataFrame)
+ESTIMATED_BYTES_PER_ROW = 2048 ## Rough size of a LoanStats csv row, used to estimate the memory of one chunk in streaming mode
+DATA_REGION_SCAN_BYTES = 64*1024 ## Number of bytes at the start and at the end of a csv file that are scanned to find the header and the junk rows after the data
+DEFAULT_PARQUET_OPTIONS = {'row_group_size': None, ## Maximum number of rows in a row group (None uses the pyarrow default; in streaming mode, every chunk is at least one row group)
+                           'data_page_size': None, ## Target size of a data page in bytes (None uses the pyarrow default of 1 MB)
+                           'compression': 'snappy', ## 'snappy', 'zstd', 'gzip', 'brotli', 'lz4', or 'none'
+                           'compression_level': None, ## e.g. 1 to 22 for zstd (None uses the codec's default level)
+                           'dictionary_columns': 'auto', ## 'auto' dictionary-encodes the low-cardinality columns (in streaming mode, judged from the first chunk only); a list of column names, True (every column), or False (no column) can also be given
+                           'partition_columns': [], ## Columns of the schema the .parquet output is hive-partitioned by (e.g. ['addr_state', 'grade']); the output is then a folder with one .parquet file per partition (Date values are written as YYYY-MM-DD)
+                           'write_statistics': True} ## Writes the min, max, and null count of every column in every row group so readers can skip row groups
+HIVE_NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__' ## Partition folder value of the rows whose partition column is null, as pyarrow and Spark name it
+DICTIONARY_MAX_DISTINCT_VALUES = 32768 ## A column with more distinct values than this is never dictionary-encoded in 'auto' mode
+AUTO_READER_SPARK_MIN_BYTES = 1024*1024*1024 ## reader='auto' only starts Spark (and its JVM) for csv files of at least this size
+AUTO_READER_SPARK_MIN_CORES = 4 ## reader='auto' only uses Spark when the process can use at least this many cores
+SCHEMA_SAMPLE_ROWS = 10000 ## Number of data rows sampled to infer a schema
+SCHEMA_SAMPLE_STRATA = 16 ## A csv file that is too big to be read in full is sampled from this many evenly spaced parts, so rows from the start, middle, and end of the file are all in the sample
+SCHEMA_SAMPLE_SCAN_FACTOR = 4 ## Each part reads up to this many times its share of the sample and keeps a reservoir sample of its share
+SCHEMA_FULL_SCAN_BYTES = 64*1024*1024 ## csv files with at most this many bytes of data are read in full to infer a schema, so whether each column has null values is known for certain
+DIAGNOSTICS_QUEUE_SIZE = 10000 ## Number of messages that can wait to be written; a message sent while the queue is full is counted and dropped instead of making the conversion wait
+DIAGNOSTICS_MAX_MESSAGES_PER_SECOND = None ## Number of messages written to the destinations per second; the messages over the limit are counted and dropped (errors are always written); None writes every message
+DIAGNOSTICS_SAMPLE_VALUES = 5 ## Number of example values kept for each aggregated warning
+BATCH_MAX_RETRIES = 2 ## Number of times a file is processed again after a transient failure (see is_transient_error) or after its worker process died
+TRANSIENT_ERRNOS = {errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR, errno.EBUSY, errno.ETIMEDOUT, errno.EIO, errno.ENOSPC} ## The OSError codes that can go away on their own (a busy or interrupted call, a timeout, a failing disk or network share, or a full disk that gets cleaned up); every other OSError (e.g. a missing file or a permission error) fails the file at once
+BATCH_RETRY_BACKOFF_SECONDS = 1 ## Seconds waited before a file is processed again; doubled for every retry after the first
+SPARK_DRIVER_MEMORY = '1g' ## The default 'spark.driver.memory' of Spark, used to estimate the memory of a JVM when the session does not set it
+SPARK_JVM_OVERHEAD_BYTES = 512*1024*1024 ## Rough memory a JVM uses outside of its heap (code, threads, and off-heap buffers)
+MEMORY_BUDGET_FRACTION = 0.8 ## Fraction of the available memory the worker processes can use when memory_budget_gb is not given
+ROW_FILTER_COMPARISONS = {'==': (pc.equal, operator.eq), '!=': (pc.not_equal, operator.ne), '<': (pc.less, operator.lt), '<=': (pc.less_equal, operator.le), '>': (pc.greater, operator.gt), '>=': (pc.greater_equal, operator.ge)} ## The comparisons a row filter can use, with the pyarrow.compute function (for Arrow arrays) and the Python operator (for Spark columns) of each; 'in' and 'not in' can also be used with a list of values
+
+## csv_to_parquet reads in a multidimensional list and returns a list where each index is either a DataFrame object or None (in streaming mode, each index is either the path of the created .parquet file or None; with the 'spark' engine, each index is either a Spark DataFrame of the created .parquet files or None)
+def csv_to_parquet(files_list, streaming=False, chunk_size=STREAMING_CHUNK_SIZE, workers=1, memory_budget_gb=None, engine='pandas', validation='fail_fast', incremental=False, metrics=None, parquet_options=None, return_type='pandas', reader='auto', session=None, infer_schema=False, schema_sample_rows=SCHEMA_SAMPLE_ROWS, diagnostics=None, journal=None, max_retries=BATCH_MAX_RETRIES, filters=None): ## files_list is a list where each index contains another list where the 0th index is a .csv file and the 1st index is a .txt file for the csv's schema; streaming reads the csv file in chunks of chunk_size rows so memory stays flat regardless of the file size; workers is the number of files processed at the same time and memory_budget_gb caps the estimated memory of the files being processed at the same time; engine is either 'pandas' (the data is converted on the driver) or 'spark' (the whole transform runs as Spark DataFrame operations and the .parquet files are written by the executors); validation is either 'fail_fast' (the first value that is not aligned with the schema stops the file) or 'report' (every value that is not aligned with the schema is written to a validation report with its row number); incremental skips the files that have not changed since they were last processed and only processes the rows appended to csv files; metrics is a PipelineMetrics object that gets the per-file, per-stage metrics of the batch; parquet_options is a dictionary that changes the DEFAULT_PARQUET_OPTIONS of the .parquet writer (row groups, page size, compression, dictionary encoding, partitioning, and statistics); return_type is what is returned for each file that is converted in memory: 'pandas' (a DataFrame), 'lazy' (a LazyParquet that only builds the DataFrame when it is used), 'arrow' (a pyarrow Table), or 'none' (the path of the .parquet output); reader is the csv parser used by the 'pandas' engine: 'spark', 'arrow' (pyarrow's multithreaded parser), 'pandas' (the pandas C parser), 'python' (the csv module), or 'auto' (picked from the size of the file and the number of cores, see choose_csv_reader); session is the ConversionSession that holds the Spark session (DEFAULT_SESSION if it is None); infer_schema is False, 'write' (a schema .txt file is inferred from schema_sample_rows sampled rows for the csv files whose schema .txt file is missing, empty, or does not have every column of the csv header, and its path is returned instead of converting the file), or 'convert' (the csv file is then converted with the inferred schema .txt file); diagnostics is the Diagnostics object the messages are sent to (DEFAULT_DIAGNOSTICS, which prints them, if it is None); journal is the path of a BatchJournal file where the outcome of every file is recorded as soon as it is known, and the files completed in an earlier run with the same journal are not processed again; max_retries is the number of times a file is processed again after a transient failure; filters is a list of (column, operator, value) row filters that every row that is kept has to match, e.g. [('issue_d', '>=', '2018-11-01'), ('loan_status', 'in', ['Current', 'Fully Paid'])], compared with the converted values (Date values are 'YYYY-MM-DD' strings) while the file is read
+    global ACTIVE_DIAGNOSTICS
     final_lst = []
+    previous_diagnostics = ACTIVE_DIAGNOSTICS
+    diagnostics = ACTIVE_DIAGNOSTICS = diagnostics or DEFAULT_DIAGNOSTICS
+    try:
+        results = process_files(files_list, streaming, chunk_size, workers, memory_budget_gb, engine, validation, incremental, parquet_options, return_type, reader, session, infer_schema, schema_sample_rows, diagnostics, journal, max_retries, filters)
+    finally:
+        diagnostics.flush() ## Every message of the batch is written before the results are returned
+        ACTIVE_DIAGNOSTICS = previous_diagnostics
+    for result, file_metrics in results:
+        final_lst.append(result)
+        if metrics is not None:
+            metrics.add(file_metrics)
+    return final_lst
+
+## process_files takes in the arguments of csv_to_parquet and returns the results of process_file_with_metrics for every file; the files completed in an earlier run of the journal are not processed again, and every other file is recorded in the journal as soon as it is done
+def process_files(files_list, streaming, chunk_size, workers, memory_budget_gb, engine, validation, incremental, parquet_options, return_type, reader, session, infer_schema, schema_sample_rows, diagnostics, journal_path, max_retries, filters):
+    filters = normalize_row_filters(filters)
+    journal = None if journal_path is None else BatchJournal(journal_path, {'engine': engine, 'parquet_options': dict(DEFAULT_PARQUET_OPTIONS, **(parquet_options or {})), 'infer_schema': infer_schema, 'filters': filters})
     if len(files_list) > 5000: ## The csv_to_parquet library read up to 5000 files
         output_message("WARNING: The csv_to_parquet library can only read a maximum of 5000 files at once. Only the first 5000 files will be read.")
+        for file in files_list[5000:] if journal is not None else []:
+            journal.record(file, 'skipped', "The csv_to_parquet library can only read a maximum of 5000 files at once.")
         files_list = files_list[:5000]
-    for file in files_list:
-        file_size_bytes = os.path.getsize(file[0])
-        file_size_gb = file_size_bytes / (1024*1024*1024)
-        if file_size_gb > 10: ## The csv_to_parquet library can only read files up to 10 GB
-            output_message(f"ERROR: The csv_to_parquet library can only read files up to 10 GB. The {file[0]} is {file_size_gb:.2f} GB and will not be processed.")
-            final_lst.append(None) ## final_lst appends None which means it will not process a file that is greater than 10 GB
+    options = {'streaming': streaming, 'chunk_size': chunk_size, 'engine': engine, 'validation': validation, 'incremental': incremental, 'parquet_options': dict(DEFAULT_PARQUET_OPTIONS, **(parquet_options or {})), 'return_type': return_type, 'reader': reader, 'session': session or DEFAULT_SESSION, 'infer_schema': infer_schema, 'schema_sample_rows': schema_sample_rows, 'diagnostics': diagnostics, 'max_retries': max_retries, 'filters': filters} ## options is passed to every file so that it can be sent to the worker processes
+    results = [None] * len(files_list)
+    indexes = [] ## The indexes of the files that need to be processed
+    for index, file in enumerate(files_list):
+        entry = None if journal is None else journal.get_completed_entry(file)
+        if entry is None:
+            indexes.append(index)
             continue
-        else:
-            schema_dictionary = parse_schema_txt_file(file[1]) ## schema_dictionary is a dictionary object that represents the schema
-            output_message("Processing the '" + file[0] + "' file.............................................................")
-            if len(schema_dictionary) == 0: ## Library cannot process a file if the schema .txt file is empty
-                output_message("ERROR: The '" + file[1] + "' schema .txt file is empty. The '" + file[0] + "' file cannot be processed.")
-                final_lst.append(None)
-                continue
-            raw_df = csv_reader(file[0], schema_dictionary) ## Getting the raw data of the csv file provided given the .txt schema file
-            if raw_df is None: ## Library cannot process the file
-                final_lst.append(None)
-                continue
-            final_lst.append(to_parquet(file[0], raw_df, schema_dictionary)) ## Standardizing the column values and outputting df to the .parquet file; in actual production, the .parquet file will be outputted to a folder/location specified by the user
-    return final_lst
+        output_message("The '" + file[0] + "' file was already processed by an earlier run of the batch and will not be processed again.")
+        journal.record(file, 'skipped', "The file was completed by an earlier run of the batch and has not changed since.", outputs=entry['outputs'])
+        results[index] = get_resumed_result(file, entry['outputs'], options)
+    if workers > 1 and engine == 'spark': ## Spark DataFrames cannot be sent back from worker processes, and every worker process would start its own JVM
+        output_message("WARNING: The 'spark' engine processes the files one at a time with the Spark session of this process, which already runs each file in parallel. workers is ignored.")
+        workers = 1
+    if workers > 1:
+        completed = process_files_in_parallel(files_list, indexes, options, workers, memory_budget_gb)
+    else:
+        completed = ((index, process_file_with_retries(files_list[index], options)) for index in indexes)
+    for index, result in completed: ## Each file is recorded as soon as it is done, so a batch that is stopped partway through can be resumed
+        results[index] = result
+        if journal is not None:
+            journal.record_result(files_list[index], result[0], result[1])
+    return results
+
+## get_resumed_result takes in the file's list, the outputs recorded in the journal when it was completed, and the options dictionary and returns what process_file_with_metrics returns for the file without processing it again: the path of the output in streaming mode, with return_type 'none', or for an inferred schema .txt file, and a LazyParquet of the outputs otherwise
+def get_resumed_result(file, outputs, options):
+    file_metrics = FileMetrics(file[0], file[1])
+    file_metrics.succeeded = True
+    file_metrics.outputs = outputs
+    if options['streaming'] or options['return_type'] == 'none' or outputs[0].endswith('.txt'):
+        return outputs[0], file_metrics
+    return LazyParquet(outputs), file_metrics
+
+## process_file_with_retries takes in the file's list and the options dictionary and returns the result of process_file_with_metrics; a transient failure (see is_transient_error) is retried up to options['max_retries'] times after a growing wait, and any other exception fails the file without stopping the rest of the batch
+def process_file_with_retries(file, options):
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            result, file_metrics = process_file_with_metrics(file, options)
+            file_metrics.attempts = attempts
+            return result, file_metrics
+        except Exception as e:
+            if not is_transient_error(e) or attempts > options['max_retries']:
+                return get_failed_result(file, e, attempts)
+            output_message("WARNING: The '" + file[0] + "' file could not be processed because of a transient error: " + repr(e) + ". It will be processed again (retry " + str(attempts) + " of " + str(options['max_retries']) + ").")
+            time.sleep(BATCH_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+## get_failed_result takes in the file's list, the exception that stopped it, and the number of attempts and returns None and the FileMetrics of the failed file
+def get_failed_result(file, e, attempts):
+    output_message("ERROR: The '" + file[0] + "' file could not be processed because of an unexpected error: " + repr(e))
+    file_metrics = FileMetrics(file[0], file[1])
+    file_metrics.error = repr(e)
+    file_metrics.attempts = attempts
+    return None, file_metrics
+
+## is_transient_error takes in an exception and returns whether processing the file again could succeed: running out of memory, network errors and timeouts, I/O errors with one of the TRANSIENT_ERRNOS, a worker process that died, and errors from the Spark JVM
+def is_transient_error(e):
+    if isinstance(e, (MemoryError, ConnectionError, TimeoutError, BrokenProcessPool)):
+        return True
+    if isinstance(e, OSError):
+        return e.errno in TRANSIENT_ERRNOS
+    return type(e).__module__.startswith('py4j') or 'OutOfMemoryError' in str(e) ## The Spark JVM ran out of memory or its gateway went away
+
+## process_file_with_metrics takes in the file's list and the options dictionary and returns the result of process_file and the FileMetrics of the file
+def process_file_with_metrics(file, options):
+    global ACTIVE_FILE_METRICS, ACTIVE_DIAGNOSTICS
+    file_metrics = ACTIVE_FILE_METRICS = FileMetrics(file[0], file[1])
+    ACTIVE_DIAGNOSTICS = options['diagnostics']
+    start = time.perf_counter()
+    start_rss = get_current_rss_bytes()
+    try:
+        result = process_file(file, options)
+    finally:
+        ACTIVE_FILE_METRICS = None
+        ACTIVE_DIAGNOSTICS.flush_file(file[0]) ## The aggregated warnings of the file are sent once the file is done
+        file_metrics.wall_seconds = time.perf_counter() - start
+        end_rss = get_current_rss_bytes()
+        file_metrics.rss_increase_bytes = None if start_rss is None or end_rss is None else end_rss - start_rss
+        file_metrics.peak_rss_bytes = get_peak_rss_bytes()
+    file_metrics.succeeded = result is not None
+    file_metrics.bytes_in = os.path.getsize(file[0])
+    if result is not None:
+        file_metrics.outputs = get_result_paths(file, result)
+        file_metrics.bytes_out = sum(get_path_size(i) for i in file_metrics.outputs)
+    return result, file_metrics
 
-## csv_reader reads the csv file and the schema .txt file and returns a DataFrame for the raw data of the .csv file        
-def csv_reader(file, schema): ## file is a single .csv file and schema is a dictionary for the .csv schema
-    columns, schema, original_file_content = get_column_names_new_schema_original_file_content(file, schema) ## columns represents the column names; schema is a dictionary that represents the file's schema; original_file_content is a nested list for the raw data
-    if columns is None and schema is None and original_file_content is None: ## This happens if the .csv file does not have a header and the number of columns in the .csv file does not equal the number of columns from the schema .txt file provided; the csv file cannot be processed
+## get_result_paths takes in the file's list and the result of process_file and returns the paths of the outputs written for the file
+def get_result_paths(file, result):
+    if isinstance(result, LazyParquet):
+        return list(result.paths)
+    if isinstance(result, str): ## The path of the .parquet output (streaming mode or return_type 'none') or of an inferred schema .txt file
+        return [result]
+    return ["../output_files/" + get_parquet_file_name(file[0])]
+
+## process_file takes in a list where the 0th index is a .csv file and the 1st index is a .txt file for the csv's schema and the options dictionary and returns either the converted data (a DataFrame object by default, see get_return_value) or None (in streaming mode, either the path of the created .parquet file or None)
+def process_file(file, options):
+    if options['infer_schema'] and schema_needs_inference(file):
+        inferred_schema_txt = infer_schema(file[0], file[1], options['schema_sample_rows'])
+        if inferred_schema_txt is None or options['infer_schema'] == 'write':
+            return inferred_schema_txt
+        file = [file[0], inferred_schema_txt]
+    if options['incremental']:
+        return process_file_incrementally(file, options)
+    file_size_bytes = os.path.getsize(file[0])
+    file_size_gb = file_size_bytes / (1024*1024*1024)
+    if file_size_gb > 10 and not options['streaming'] and options['engine'] != 'spark': ## The csv_to_parquet library can only read files up to 10 GB
+        output_message(f"ERROR: The csv_to_parquet library can only read files up to 10 GB. The {file[0]} is {file_size_gb:.2f} GB and will not be processed.")
+        return None ## returning None means it will not process a file that is greater than 10 GB
+    schema_dictionary = get_compiled_schema(file[1]) ## schema_dictionary is a dictionary object that represents the schema, where each column is a ColumnSpec
+    output_message("Processing the '" + file[0] + "' file.............................................................")
+    if schema_dictionary is None: ## Library cannot process a file if the schema .txt file has a data type that is not supported
+        return None
+    if len(schema_dictionary) == 0: ## Library cannot process a file if the schema .txt file is empty
+        output_message("ERROR: The '" + file[1] + "' schema .txt file is empty. The '" + file[0] + "' file cannot be processed.")
+        return None
+    if options['engine'] == 'spark': ## The data never leaves the Spark executors, so the 10 GB limit does not apply
+        return spark_csv_to_parquet(file[0], schema_dictionary, options['validation'], options['parquet_options'], options['session'], options['filters'])
+    reader = get_csv_reader(file[0], file_size_bytes, options)
+    if options['streaming']: ## The file is never fully loaded into memory, so the 10 GB limit does not apply
+        return stream_csv_to_parquet(file[0], schema_dictionary, options['chunk_size'], options['validation'], options['parquet_options'], reader, options['filters'])
+    raw_table = csv_reader(file[0], schema_dictionary, reader, options['session']) ## Getting the raw data of the csv file provided given the .txt schema file
+    if raw_table is None: ## Library cannot process the file
         return None
-    raw_data_content = get_raw_data(original_file_content, columns) ## getting the raw DataFrame from the raw nested list and the columns
-    raw_data_content = check_if_columns_in_csv_not_in_schema(raw_data_content, file, schema) ## Checking if columns in the DataFrame are not in the schema .txt file and removing these columns
+    table = to_parquet(file[0], raw_table, schema_dictionary, options['validation'], options['parquet_options'], options['filters']) ## Standardizing the column values and outputting the table to the .parquet file; in actual production, the .parquet file will be outputted to a folder/location specified by the user
+    if table is None:
+        return None
+    return get_return_value(table, "../output_files/" + get_parquet_file_name(file[0]), options['return_type'])
+
+## get_pandas_types returns the pandas data types of the Integer and String columns when a DataFrame is built from the Arrow data (Double and Date columns use the pyarrow defaults, float64 and datetime64); pandas is imported the first time it is called
+@lru_cache(maxsize=None)
+def get_pandas_types():
+    return {pa.int64(): pd.Int64Dtype(), pa.string(): pd.StringDtype()}
+
+## get_return_value takes in the converted Arrow table, the path of its .parquet output, and the return type and returns what csv_to_parquet returns for the file; the DataFrame is only built from the Arrow data when it is asked for
+def get_return_value(table, parquet_path, return_type):
+    if return_type == 'arrow':
+        return table
+    if return_type == 'lazy':
+        return LazyParquet([parquet_path], table)
+    if return_type == 'none': ## The converted data is not kept in memory
+        return parquet_path
+    return table.to_pandas(types_mapper=get_pandas_types().get)
+
+## get_csv_reader takes in the .csv file name, its size in bytes, and the options dictionary and returns the reader the file is read with
+def get_csv_reader(file, file_size_bytes, options):
+    reader = options['reader']
+    if reader == 'auto':
+        return choose_csv_reader(file_size_bytes, options['streaming'])
+    if reader == 'spark' and options['streaming']: ## Spark collects the whole file to the driver, so it cannot read one chunk at a time
+        output_message("WARNING: The Spark reader cannot read the '" + file + "' file one chunk at a time. The pyarrow reader will be used instead.")
+        return 'arrow'
+    return reader
+
+## choose_csv_reader takes in the size of the csv file in bytes and whether it is streamed and returns the reader 'auto' picks; Spark is only worth its JVM startup for csv files of at least AUTO_READER_SPARK_MIN_BYTES that are read in memory on a machine with at least AUTO_READER_SPARK_MIN_CORES cores, every other file is read by pyarrow's multithreaded parser (or by the pandas C parser when there is only one core to use)
+def choose_csv_reader(file_size_bytes, streaming):
+    cores = get_available_cores()
+    if not streaming and file_size_bytes >= AUTO_READER_SPARK_MIN_BYTES and cores >= AUTO_READER_SPARK_MIN_CORES:
+        return 'spark'
+    return 'arrow' if cores > 1 else 'pandas'
+
+## get_available_cores returns the number of cores this process can run on
+def get_available_cores():
+    if hasattr(os, 'sched_getaffinity'): ## Only the cores this process is allowed to use (e.g. in a container)
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+## process_files_in_parallel takes in the multidimensional list of files, the indexes of the files to process, the options dictionary, the number of worker processes, and the memory budget in GB and yields the index and the result of process_file_with_retries of each file as soon as it is done; a file is only started when the estimated memory of the files being processed fits in the memory budget, and when a worker process dies (e.g. it was killed for using too much memory) the files it took down are processed again, up to options['max_retries'] times, by half as many worker processes
+def process_files_in_parallel(files_list, indexes, options, workers, memory_budget_gb):
+    memory_budget = get_memory_budget_bytes(memory_budget_gb)
+    pending = deque((index, estimate_memory_bytes(files_list[index][0], options), 0) for index in indexes) ## The index of the file, its estimated memory, and the number of times a worker process died while processing it
+    while len(pending) > 0:
+        running = {} ## The keys will be the futures of the files being processed; the values will be the index of the file, its estimated memory, and the number of times a worker process died while processing it
+        crashed = [] ## The files being processed when the worker processes died
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while len(running) > 0 or (len(pending) > 0 and len(crashed) == 0):
+                if len(pending) > 0 and len(crashed) == 0 and len(running) < workers and (memory_budget is None or len(running) == 0 or sum(i[1] for i in running.values()) + pending[0][1] <= memory_budget): ## A file that is bigger than the whole budget is processed by itself
+                    index, memory_estimate, crashes = pending.popleft()
+                    running[executor.submit(process_file_in_worker, files_list[index], options)] = (index, memory_estimate, crashes)
+                    continue
+                done, not_done = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, memory_estimate, crashes = running.pop(future)
+                    try:
+                        yield index, future.result()
+                    except BrokenProcessPool as e: ## Every file being processed fails with the worker process that died
+                        crashed.append((index, memory_estimate, crashes + 1, e))
+                    except Exception as e: ## One failed file should not stop the rest of the batch
+                        yield index, get_failed_result(files_list[index], e, 1)
+        for index, memory_estimate, crashes, e in sorted(crashed, key=lambda i: i[0], reverse=True):
+            if crashes > options['max_retries']:
+                yield index, get_failed_result(files_list[index], e, crashes)
+            else:
+                pending.appendleft((index, memory_estimate, crashes))
+        if len(crashed) > 0 and workers > 1:
+            workers = max(1, workers // 2)
+            output_message("WARNING: A worker process died while processing " + str(len(crashed)) + " files. The rest of the batch will be processed by " + str(workers) + " worker processes.")
+
+## process_file_in_worker takes in the file's list and the options dictionary and returns the result of process_file_with_retries after the messages of the file are written, since a worker process can be stopped without its background threads finishing
+def process_file_in_worker(file, options):
+    try:
+        return process_file_with_retries(file, options)
+    finally:
+        ACTIVE_DIAGNOSTICS.flush()
+
+## get_memory_budget_bytes takes in the memory budget in GB and returns it in bytes; when it is None, MEMORY_BUDGET_FRACTION of the memory that is available is used (None if it cannot be found), so the worker processes are never started faster than the machine can hold them
+def get_memory_budget_bytes(memory_budget_gb):
+    if memory_budget_gb is not None:
+        return memory_budget_gb * 1024*1024*1024
+    available_memory = get_available_memory_bytes()
+    return None if available_memory is None else available_memory * MEMORY_BUDGET_FRACTION
+
+## get_available_memory_bytes returns the memory that can be used without swapping, or None if it cannot be found
+def get_available_memory_bytes():
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError: ## Not Linux
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+## estimate_memory_bytes takes in the .csv file name and the options dictionary and returns a rough estimate of the memory needed to process the file
+def estimate_memory_bytes(file, options):
+    try:
+        file_size_bytes = os.path.getsize(file)
+    except OSError: ## The worker process reports the missing file
+        return 0
+    if options['engine'] == 'spark': ## The data is held by the Spark executors, but the JVM of the Spark session still needs its memory
+        return get_jvm_memory_bytes(options['session'])
+    reader = choose_csv_reader(file_size_bytes, options['streaming']) if options['reader'] == 'auto' else options['reader']
+    jvm_memory_bytes = get_jvm_memory_bytes(options['session']) if reader == 'spark' and not options['streaming'] else 0 ## The 'spark' reader starts a JVM in the worker process
+    if options['streaming']: ## Only one chunk is in memory at a time
+        file_size_bytes = min(file_size_bytes, options['chunk_size'] * ESTIMATED_BYTES_PER_ROW)
+    return file_size_bytes * MEMORY_PER_CSV_BYTE + jvm_memory_bytes
+
+## get_jvm_memory_bytes takes in the ConversionSession and returns the estimated memory in bytes of its JVM: the 'spark.driver.memory' of the session (SPARK_DRIVER_MEMORY when it is not set or cannot be read) plus SPARK_JVM_OVERHEAD_BYTES
+def get_jvm_memory_bytes(session):
+    units = {'k': 1024, 'm': 1024**2, 'g': 1024**3, 't': 1024**4}
+    memory = str(session.spark_conf.get('spark.driver.memory', SPARK_DRIVER_MEMORY)).strip().lower()
+    memory = memory[:-1] if memory.endswith('b') and memory[-2:-1] in units else memory ## e.g. '4gb'
+    unit = units['m'] ## Spark reads a number without a unit as MiB
+    if memory[-1:] in units:
+        memory, unit = memory[:-1], units[memory[-1]]
+    try:
+        return int(float(memory) * unit) + SPARK_JVM_OVERHEAD_BYTES
+    except ValueError:
+        return int(SPARK_DRIVER_MEMORY[:-1]) * units[SPARK_DRIVER_MEMORY[-1]] + SPARK_JVM_OVERHEAD_BYTES
+
+## csv_reader reads the csv file with the reader and the schema .txt file and returns an Arrow table for the raw data of the .csv file        
+def csv_reader(file, schema, reader='spark', session=None): ## file is a single .csv file, schema is a dictionary for the .csv schema, reader is one of the keys of CSV_READERS or 'spark', and session is the ConversionSession of the 'spark' reader
+    columns, schema, raw_data_content = get_column_names_new_schema_original_file_content(file, schema, reader, session) ## columns represents the column names; schema is a dictionary that represents the file's schema; raw_data_content is the raw Arrow table without the junk rows
+    if columns is None and schema is None and raw_data_content is None: ## This happens if the .csv file does not have a header and the number of columns in the .csv file does not equal the number of columns from the schema .txt file provided; the csv file cannot be processed
+        return None
+    with record_stage('raw_data'):
+        raw_data_content = check_if_columns_in_csv_not_in_schema(raw_data_content, file, schema) ## Checking if columns in the table are not in the schema .txt file and removing these columns
+    record_rows(rows_in=len(raw_data_content))
     return raw_data_content
 
-## to_parquet takes in the .csv file name, the raw DataFrame, and the schema dictionary and standardizes the columns, ensures the data types are aligned with the schema, ensures that the nullability rules are aligned with the schema, exports the transformed DataFrame to a .parquet file, and returns the transformed DataFrame
-def to_parquet(file, df, schema):
-    for i in df.columns:
-        df[i] = [get_column_values(file, v, i, schema[i]) for v in df[i]] ## Getting the values for each of the columns
-    
-    for i in df.columns:
-        for j in df[i]:
-            if 'Invalid Conversion' in str(j):
-                output_message("ERROR: The '" + i + "' column has a value of '" + str(j).split('-')[0] + "' which cannot be converted to " + schema[i][0] + ". The '" + file + "' file cannot be processed.")
-                return None
-    
-    for i in df.columns:
-        if schema[i][0] == 'Integer':
-            df[i] = pd.to_numeric(df[i], errors='coerce').astype('Int64')
-        elif schema[i][0] == 'String':
-            df[i] = pd.Series(df[i], dtype="string")
-        elif schema[i][0] == 'Date':
-            df[i] = pd.to_datetime(df[i], format = '%Y-%m-%d')
-    null_columns = df.columns[df.isna().any()].tolist()
-    for i in null_columns:
-        if schema[i][1] == 'false':
+## to_parquet takes in the .csv file name, the raw Arrow table, the schema dictionary, the validation mode, the parquet options, and the row filters and standardizes the columns, ensures the data types are aligned with the schema, ensures that the nullability rules are aligned with the schema, removes the rows that do not match the row filters, exports the transformed table to a .parquet file, and returns the transformed Arrow table
+def to_parquet(file, table, schema, validation='fail_fast', parquet_options=None, row_filters=None):
+    violations = []
+    row_filters = get_row_filters(file, row_filters or [], schema)
+    if row_filters is None:
+        return None
+    table = convert_table(file, table, schema, validation, violations, row_filters=row_filters)
+    if table is None: ## The data types or nullability rules are not aligned with the schema
+        if len(violations) > 0:
+            write_validation_report(file, violations)
+        return None
+    if not os.path.exists("../output_files"):
+        os.makedirs("../output_files")
+    #parquet_file = file.split('.csv')[0] + " - " + str(datetime.now().hour) + '_' + str(datetime.now().minute) + '_' + str(datetime.now().second) + ".parquet" ## For Testing Purposes
+    parquet_file = get_parquet_file_name(file)
+    with record_stage('write'):
+        table = table.cast(get_arrow_schema(table.column_names, schema)) ## The same column types as the streaming mode, with the pandas metadata so readers that build a DataFrame from the .parquet file get the same data types as the returned DataFrame
+        parquet_output = ParquetOutput(file, "../output_files/" + parquet_file, parquet_options or DEFAULT_PARQUET_OPTIONS, table.schema)
+        try:
+            parquet_output.write(table)
+        except BaseException:
+            parquet_output.abort()
+            raise
+        parquet_output.close()
+    record_rows(rows_out=len(table))
+    output_message("The '" + file + "' file has been successfully processed and the '" + parquet_file + "' file has been created.............................................................")
+    return table
+
+## convert_table takes in the .csv file name, the raw Arrow table, the schema dictionary, the validation mode, the list that collects the violations in 'report' mode, the number of data rows before the table (for chunks), and the row filters and returns the Arrow table with standardized values and data types aligned with the schema, or None if the values or nullability rules are not aligned with the schema
+## In 'fail_fast' mode, the first violation stops the file before the rest of its columns are converted; in 'report' mode, every violation is added to the violations list with its data row number (starting at 1)
+## The columns of the row filters are converted (and validated) first, so the rest of the columns are only converted for the rows that match the row filters
+def convert_table(file, table, schema, validation='fail_fast', violations=None, row_offset=0, row_filters=None):
+    has_violations = False
+    converted_columns = {} ## The keys will be the column names; the values will be the converted Arrow arrays
+    filter_columns = [i for i in dict.fromkeys(i[0] for i in row_filters or []) if i in table.column_names]
+    for i in filter_columns:
+        converted_columns[i], column_has_violations = convert_table_column(file, table, i, schema[i], validation, violations, row_offset)
+        if column_has_violations and validation == 'fail_fast':
+            return None
+        has_violations = has_violations or column_has_violations
+    row_numbers = None ## The positions of the rows that match the row filters
+    if len(filter_columns) > 0:
+        with record_stage('filter'):
+            keep = get_row_filter_mask(converted_columns, row_filters)
+            row_numbers = np.flatnonzero(keep)
+            table = table.filter(pa.array(keep))
+            converted_columns = {i: converted_columns[i].filter(pa.array(keep)) for i in converted_columns}
+    for i in table.column_names:
+        if i in converted_columns:
+            continue
+        converted_columns[i], column_has_violations = convert_table_column(file, table, i, schema[i], validation, violations, row_offset, row_numbers)
+        if column_has_violations and validation == 'fail_fast':
+            return None
+        has_violations = has_violations or column_has_violations
+    if has_violations:
+        return None
+    return pa.Table.from_arrays([converted_columns[i] for i in table.column_names], names=table.column_names)
+
+## convert_table_column takes in the .csv file name, the raw Arrow table, the column name, the ColumnSpec of the column, the validation mode, the list that collects the violations in 'report' mode, the number of data rows before the table, and the positions of the rows of the table in the chunk (None if no rows were removed by the row filters) and returns the converted column and whether it has values that are not aligned with the schema
+def convert_table_column(file, table, i, column_spec, validation, violations, row_offset, row_numbers=None):
+    raw_values = table.column(i).combine_chunks()
+    with record_stage('convert', i):
+        values, invalid_values = column_spec.converter(file, raw_values, i, column_spec.schema_lst, row_offset) ## Converting and validating one whole column at a time with the converter resolved when the schema was compiled
+    null_rows = np.setdiff1d(np.flatnonzero(values.is_null().to_numpy(zero_copy_only=False)), invalid_values.index) if not column_spec.nullable else [] ## Invalid values are also null after the conversion, but they are reported as invalid values
+    if validation == 'fail_fast':
+        if len(invalid_values) > 0:
+            output_message("ERROR: The '" + i + "' column has a value of '" + invalid_values.iloc[0].split('-')[0] + "' which cannot be converted to " + column_spec.data_type.value + ". The '" + file + "' file cannot be processed.")
+            return values, True
+        if len(null_rows) > 0:
             output_message("ERROR: The '" + i + "' column in the '" + file + "' file has null values when the schema .txt file says it cannot have null values. The '" + file + "' file cannot be processed.")
+            return values, True
+        return values, False
+    for row in invalid_values.index:
+        violations.append({'column': i, 'row': row_offset + int(row if row_numbers is None else row_numbers[row]) + 1, 'value': raw_values[int(row)].as_py(), 'violation': 'cannot be converted to ' + column_spec.data_type.value})
+    for row in null_rows:
+        violations.append({'column': i, 'row': row_offset + int(row if row_numbers is None else row_numbers[row]) + 1, 'value': raw_values[int(row)].as_py(), 'violation': 'null value in a column that cannot have null values'})
+    return values, len(invalid_values) > 0 or len(null_rows) > 0
+
+## normalize_row_filters takes in the row filters given to csv_to_parquet and returns them as [column, operator, value] lists, with the values of 'in' and 'not in' as lists and dates as 'YYYY-MM-DD' strings, so they can be sent to the worker processes and stored in the manifests and the journal
+def normalize_row_filters(filters):
+    normalized_filters = []
+    for column, comparison, value in filters or []:
+        values = [value] if comparison not in ('in', 'not in') else [value] if isinstance(value, str) else list(value)
+        values = [i.isoformat() if isinstance(i, (datetime, date)) else i for i in values]
+        normalized_filters.append([column, comparison, values if comparison in ('in', 'not in') else values[0]])
+    return normalized_filters
+
+## get_row_filters takes in the .csv file name, the row filters, and the schema dictionary of the columns of the file and returns the row filters, or None if a row filter has a column that is not in the schema .txt file and the csv data, an operator that is not supported, or a value that cannot be converted to the data type of its column; the file is then not processed, since ignoring a row filter would write rows that were not asked for
+def get_row_filters(file, row_filters, schema):
+    if len(row_filters) == 0:
+        return row_filters
+    arrow_schema = get_arrow_schema(list(schema), schema)
+    for column, comparison, value in row_filters:
+        if column not in schema:
+            output_message("ERROR: The '" + column + "' column of the row filters is not in the schema .txt file or the csv data of the '" + file + "' file. The '" + file + "' file cannot be processed.")
+            return None
+        if comparison not in ROW_FILTER_COMPARISONS and comparison not in ('in', 'not in'):
+            output_message("ERROR: The '" + str(comparison) + "' operator of the row filter on the '" + column + "' column is not supported. The '" + file + "' file cannot be processed.")
+            return None
+        try:
+            pa.array(value if comparison in ('in', 'not in') else [value]).cast(arrow_schema.field(column).type)
+        except (pa.ArrowException, TypeError):
+            output_message("ERROR: The value " + repr(value) + " of the row filter on the '" + column + "' column cannot be converted to " + schema[column].data_type.value + ". The '" + file + "' file cannot be processed.")
             return None
+    return row_filters
+
+## get_row_filter_mask takes in the converted columns of the row filters and the row filters and returns a numpy array that says whether each row matches every row filter; rows with a null value in a column of the row filters never match
+def get_row_filter_mask(converted_columns, row_filters):
+    keep = None
+    for column, comparison, value in row_filters:
+        values = converted_columns[column]
+        if comparison in ('in', 'not in'):
+            matches = pc.is_in(values, value_set=pa.array(value).cast(values.type), skip_nulls=True)
+            if comparison == 'not in':
+                matches = pc.invert(matches)
+        else:
+            matches = ROW_FILTER_COMPARISONS[comparison][0](values, pa.array([value]).cast(values.type)[0])
+        matches = pc.fill_null(matches, False).to_numpy(zero_copy_only=False)
+        keep = matches if keep is None else keep & matches
+    return keep
+
+## write_validation_report takes in the .csv file name and the list of violations found in 'report' mode and writes the violations to a '<csv file> - Validation Report.csv' file next to the .parquet files
+def write_validation_report(file, violations):
     if not os.path.exists("../output_files"):
         os.makedirs("../output_files")
-    #parquet_file = file.split('.csv')[0] + " - " + str(datetime.now().hour) + '_' + str(datetime.now().minute) + '_' + str(datetime.now().second) + ".parquet" ## For Testing Purposes
-    parquet_file = file.split('.csv')[0] + ".parquet"
-    df.to_parquet("../output_files/" + parquet_file)
+    report_file = file.split('.csv')[0] + " - Validation Report.csv"
+    temp_path = get_temp_path("../output_files/" + report_file)
+    remove_stale_temp_outputs("../output_files/" + report_file)
+    with open(temp_path, 'w', newline='') as report:
+        writer = csv.DictWriter(report, fieldnames=['column', 'row', 'value', 'violation'])
+        writer.writeheader()
+        writer.writerows(violations)
+    os.replace(temp_path, "../output_files/" + report_file)
+    column_violations = {} ## The keys will be the column names; the values will be the violations of the column
+    for i in violations:
+        column_violations.setdefault(i['column'], []).append(i)
+    for i in column_violations:
+        output_message("ERROR: The '" + i + "' column in the '" + file + "' file has " + str(len(column_violations[i])) + " values that are not aligned with the schema .txt file (the first one is in row " + str(column_violations[i][0]['row']) + ": '" + str(column_violations[i][0]['value']) + "' " + column_violations[i][0]['violation'] + ").")
+    output_message("ERROR: The '" + file + "' file has " + str(len(violations)) + " values that are not aligned with the schema .txt file. They are listed in the '" + report_file + "' file. The '" + file + "' file cannot be processed.")
+
+## convert_integer_column takes in the .csv file name, the raw values of a column as an Arrow string array, the name of the column, the list from the schema dictionary that represents the column, and the number of data rows before the values (for chunks) and returns the converted Arrow array of an Integer column and the Series of the 'Invalid Conversion' strings of the values that cannot be converted
+def convert_integer_column(file, values, col, schema_lst, row_offset=0):
+    numeric, invalid_values = get_numeric_values(values)
+    decimal = pc.and_(numeric, pc.match_substring(values, '.')) ## If an Integer value is numerical but has a decimal in it - convert decimal to int
+    decimal_rows = np.flatnonzero(pc.fill_null(decimal, False).to_numpy(zero_copy_only=False))
+    if len(decimal_rows) > 0: ## One aggregated warning for the column instead of one per value
+        output_value_warning(file, col, len(decimal_rows), [i + ' -> ' + str(int(float(i))) for i in pc.filter(values, decimal)[:DIAGNOSTICS_SAMPLE_VALUES].to_pylist()], row_offset + int(decimal_rows[0]) + 1, "with a decimal", " and the schema .txt file says the '" + col + "' column is an Integer. They will be converted to Integers.")
+    truncated = pc.cast(pc.trunc(pc.cast(pc.if_else(decimal, values, None), pa.float64())), pa.int64())
+    integers = pc.cast(pc.replace_substring_regex(pc.if_else(pc.and_(numeric, pc.invert(decimal)), values, None), r'^\+', ''), pa.int64()) ## pyarrow does not parse a leading '+' sign
+    return pc.if_else(decimal, truncated, integers), invalid_values
+
+## convert_double_column takes in the same arguments as convert_integer_column and converts a Double column
+def convert_double_column(file, values, col, schema_lst, row_offset=0):
+    numeric, invalid_values = get_numeric_values(values)
+    return pc.cast(pc.if_else(numeric, values, None), pa.float64()), invalid_values
+
+## get_numeric_values takes in the raw values of a Double or Integer column and returns a boolean mask of the numerical values and the Series of the 'Invalid Conversion' strings of the non-numerical values
+def get_numeric_values(values):
+    numeric = pc.match_substring_regex(values, NUMERIC_PATTERN)
+    invalid = pc.and_(pc.invert(pc.equal(values, '')), pc.invert(numeric)) ## If there is a non-numerical value
+    return numeric, get_invalid_values(values, invalid, '-Invalid Conversion')
+
+## convert_string_column takes in the same arguments as convert_integer_column and converts a String column; the values stay in an Arrow string array
+def convert_string_column(file, values, col, schema_lst, row_offset=0):
+    invalid_values = get_invalid_values(values, pc.match_substring(values, 'Invalid Conversion'), '')
+    return pc.if_else(pc.or_(pc.equal(values, ''), pc.equal(pc.utf8_lower(values), 'n/a')), pa.scalar(None, pa.string()), values), invalid_values
+
+## convert_date_column takes in the same arguments as convert_integer_column and converts a Date column; the column is dictionary-encoded so each distinct value is only standardized once
+def convert_date_column(file, values, col, schema_lst, row_offset=0):
+    encoded = pc.dictionary_encode(values)
+    distinct_values = encoded.dictionary.to_pylist()
+    standardized_values = get_standardized_date_values(distinct_values, schema_lst)
+    invalid_distinct = np.array(['Invalid Conversion' in str(standardized_values[i]) for i in distinct_values], dtype=bool)
+    dates = pa.array([None if invalid else standardized_values[i] for i, invalid in zip(distinct_values, invalid_distinct)], type=pa.date32()) ## Invalid values are null in the converted column
+    invalid = pc.is_in(encoded.indices, value_set=pa.array(np.flatnonzero(invalid_distinct), type=encoded.indices.type))
+    invalid_values = get_invalid_values(values, invalid, '').map(lambda i: str(standardized_values[i])) ## The 'Invalid Conversion' strings from get_column_values
+    return pc.cast(pc.take(dates, encoded.indices), pa.timestamp('s')), invalid_values
+
+## get_standardized_date_values takes in the distinct raw values of a Date column and the list from the schema dictionary that represents the column and returns a dictionary where the keys are the raw values and the values are the standardized dates (or the 'Invalid Conversion' strings from get_column_values)
+def get_standardized_date_values(distinct_values, schema_lst):
+    date_format = detect_date_format(distinct_values[:DATE_FORMAT_SAMPLE_SIZE], schema_lst)
+    standardized_values = {}
+    for i in distinct_values:
+        standardized_values[i] = parse_date_with_format(i, date_format) ## Fast parser for the column's dominant date format
+        if standardized_values[i] is None: ## Values that do not follow the dominant date format are standardized by get_column_values
+            standardized_values[i] = standardize_date_value(i, tuple(schema_lst))
+    return standardized_values
+
+## DATE_FORMATS has the date formats that have a fast parser; each date format has a compiled pattern, a function that turns the pattern's groups into a date, and whether it can be used for Date columns that do not need standardization (dateutil reads 'Mon-YY' values as a day of the current year, so those are only fast parsed when standardization is applied)
+DATE_FORMATS = {
+    'Mon-YY': (re.compile(r'^(' + MONTH_ABBREVIATIONS + r')-([0-9]+)$'), lambda g: date(get_standardized_year(g[1]), calendar.month_abbr[:].index(g[0]), 1), False),
+    'YY-Mon': (re.compile(r'^([0-9]+)-(' + MONTH_ABBREVIATIONS + r')$'), lambda g: date(get_standardized_year(g[0]), calendar.month_abbr[:].index(g[1]), 1), False),
+    'YYYY-MM-DD': (re.compile(r'^([0-9]{4})-([0-9]{2})-([0-9]{2})$'), lambda g: date(int(g[0]), int(g[1]), int(g[2])), True),
+    'MM/DD/YYYY': (re.compile(r'^([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})$'), lambda g: date(int(g[2]), int(g[0]), int(g[1])), True),
+    'YYYYMMDD': (re.compile(r'^([1-9][0-9]{3})([0-9]{2})([0-9]{2})$'), lambda g: date(int(g[0]), int(g[1]), int(g[2])), True)
+}
+
+## detect_date_format takes in a sample of the distinct values of a Date column and the list from the schema dictionary that represents the column and returns the date format from DATE_FORMATS that matches the most values (None if no values match)
+def detect_date_format(sample, schema_lst):
+    format_counts = {}
+    for date_format, (pattern, to_date, without_standardization) in DATE_FORMATS.items():
+        if schema_lst[2] == 'false' and not without_standardization:
+            continue
+        format_counts[date_format] = sum(1 for i in sample if pattern.match(i))
+    if len(format_counts) == 0 or max(format_counts.values()) == 0:
+        return None
+    return max(format_counts, key=format_counts.get)
+
+## parse_date_with_format takes in a raw value and a date format from DATE_FORMATS and returns the value as a date, or None if the value does not follow the date format or is not a valid date
+def parse_date_with_format(value, date_format):
+    if date_format is None:
+        return None
+    pattern, to_date, without_standardization = DATE_FORMATS[date_format]
+    match = pattern.match(value)
+    if match is None:
+        return None
+    try:
+        return to_date(match.groups())
+    except ValueError: ## Invalid dates are left to get_column_values so they are reported the same way
+        return None
+
+## get_standardized_year takes in the digits of a year and returns the year the same way get_column_values does: years less than or equal to the last two digits of the current year are in the 2000s, the rest are in the 1900s
+def get_standardized_year(year):
+    if int(year) <= int(str(datetime.today().year)[-2:]):
+        return int(year) + 2000
+    return int(year) + 1900
+
+## standardize_date_value takes in a raw value of a Date column and the schema list (as a tuple so it can be cached) and returns the value from get_column_values; recently used values are cached so each distinct date string is only parsed once
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def standardize_date_value(value, schema_lst):
+    return get_column_values('', value, '', list(schema_lst))
+
+## get_invalid_values takes in the raw values of a column, a boolean mask of the values that cannot be converted, and the suffix that marks an invalid conversion and returns a Series of the invalid values with the suffix, indexed by their row position
+def get_invalid_values(values, invalid, suffix):
+    invalid = pc.fill_null(invalid, False)
+    invalid_rows = np.flatnonzero(invalid.to_numpy(zero_copy_only=False))
+    return pd.Series([str(i) + suffix for i in pc.filter(values, invalid).to_pylist()], index=invalid_rows, dtype=object)
+
+## get_parquet_file_name takes in the .csv file name and returns the name of the .parquet file created for it
+def get_parquet_file_name(file):
+    return file.split('.csv')[0] + ".parquet"
+
+## stream_csv_to_parquet takes in the .csv file name, the schema dictionary, the number of rows per chunk, the validation mode, the parquet options, the reader, the row filters, and whether only the columns in the schema can be parsed (see get_projection) and converts the csv file one chunk at a time, appending each chunk to the .parquet file as a row group; returns the path of the .parquet file or None
+def stream_csv_to_parquet(file, schema, chunk_size, validation='fail_fast', parquet_options=None, reader='python', row_filters=None, projected=True):
+    projection = None
+    with record_stage('read'):
+        region = detect_data_region(file)
+        if region is not None: ## The header was found in the first few KB of the file, so the bulk reader starts right after it, stops before the junk rows at the end, and only parses the columns in the schema
+            columns, schema, width, columns_to_keep, start_offset = get_region_columns(file, schema, region)
+            if columns is not None:
+                projection = get_projection(columns, columns_to_keep, region) if projected else None
+                chunks = CSV_READERS[reader](file, width, start_offset, region.data_end, chunk_size, projection)
+        else: ## The header is looked for in the first chunk of the python reader
+            chunks = read_csv_chunks(file, chunk_size)
+            columns, schema, width, columns_to_keep, first_chunk = get_streaming_columns(file, schema, chunks)
+            chunks = (rows_to_table(i, width) for i in chain_chunks(first_chunk, chunks, width))
+    if columns is None:
+        return None
+    parquet_file = get_parquet_file_name(file)
+    parquet_path = "../output_files/" + parquet_file
+    recorded_rows = get_recorded_rows()
+    try:
+        written = write_chunks_to_parquet(file, chunks, columns, columns_to_keep, schema, parquet_path, validation, parquet_options, projection, row_filters)
+    except IrregularRowsError: ## Nothing was written, so the file is streamed again by the python reader
+        reset_recorded_rows(recorded_rows) ## The rows of the chunks before the irregular row are counted again by the python reader
+        output_irregular_rows_warning(file)
+        return stream_csv_to_parquet(file, schema, chunk_size, validation, parquet_options, 'python', row_filters, projected)
+    except UnclassifiedRowsError: ## Nothing was written, so the file is streamed again with every column parsed
+        reset_recorded_rows(recorded_rows)
+        return stream_csv_to_parquet(file, schema, chunk_size, validation, parquet_options, reader, row_filters, False)
+    if not written:
+        return None
     output_message("The '" + file + "' file has been successfully processed and the '" + parquet_file + "' file has been created.............................................................")
-    return df
+    return parquet_path
+
+## get_streaming_columns takes in the .csv file name, the schema dictionary, and the generator of chunks and reads the first chunk to return the Column Names, New Schema, row width, the columns that are in the schema, and the first chunk with its rows padded to the row width (None for all of them if the csv file cannot be processed)
+def get_streaming_columns(file, schema, chunks):
+    first_chunk = next(chunks, [])
+    width = max([len(i) for i in first_chunk], default=0) ## Rows are padded to the widest row of the first chunk, the same way Spark fills missing values with nulls
+    first_chunk = normalize_rows(first_chunk, width)
+    columns, schema = get_columns_and_new_schema(file, schema, first_chunk) ## The header has to be in the first chunk; rows past it are never buffered
+    if columns is None and schema is None:
+        return None, None, None, None, None
+    columns_to_keep = check_if_columns_in_csv_not_in_schema(get_raw_data([], columns), file, schema).column_names ## Warning about the columns not in the schema once instead of once per chunk
+    return columns, schema, width, columns_to_keep, first_chunk
+
+## get_region_columns takes in the .csv file name, the schema dictionary, and the DataRegion of the csv file and returns the Column Names, New Schema, row width, the columns that are in the schema, and the byte offset the data starts at (None for all of them if the csv file cannot be processed)
+def get_region_columns(file, schema, region):
+    columns, schema = get_columns_and_new_schema(file, schema, region.prefix_rows)
+    if columns is None and schema is None:
+        return None, None, None, None, None
+    columns_to_keep = check_if_columns_in_csv_not_in_schema(get_raw_data([], columns), file, schema).column_names
+    start_offset = region.header_end if columns == region.header else 0 ## If the csv file does not have a header, the data is read from the start of the file and the junk rows are removed by get_raw_data
+    return columns, schema, region.width, columns_to_keep, start_offset
+
+## write_chunks_to_parquet takes in the .csv file name, the chunks of raw Arrow tables (see CSV_READERS), the Column Names, the columns that are in the schema, the schema dictionary, the path of the .parquet file, the validation mode, the parquet options, the positions of the columns in the chunks (None if the chunks have every column, see get_projection), the row filters, and the number of data rows before the first chunk (the rows processed by an earlier run, when only the rows appended to the csv file are read) and converts and appends the rows of every chunk that match the row filters to the .parquet file as one or more row groups; returns True if the .parquet file was created
+def write_chunks_to_parquet(file, chunks, columns, columns_to_keep, schema, parquet_path, validation, parquet_options=None, projection=None, row_filters=None, row_offset=0):
+    row_filters = get_row_filters(file, row_filters or [], schema)
+    if row_filters is None:
+        return False
+    if not os.path.exists(os.path.dirname(parquet_path)):
+        os.makedirs(os.path.dirname(parquet_path))
+    arrow_schema = get_arrow_schema(columns_to_keep, schema)
+    parquet_output = ParquetOutput(file, parquet_path, parquet_options or DEFAULT_PARQUET_OPTIONS, arrow_schema)
+    violations = [] ## row_offset is the number of data rows in the previous chunks, so violations are reported with their row number in the whole file
+    try:
+        for chunk in record_chunks(chunks):
+            with record_stage('raw_data'):
+                raw_table = filter_raw_table(chunk, columns) if projection is None else filter_projected_table(chunk, columns, projection)
+            record_rows(rows_in=len(raw_table))
+            if len(raw_table) == 0: ## Chunk only had empty rows or headers
+                continue
+            table = convert_table(file, raw_table.select(columns_to_keep), schema, validation, violations, row_offset, row_filters)
+            row_offset += len(raw_table)
+            if table is None and validation == 'fail_fast':
+                parquet_output.abort()
+                return False
+            if table is None or len(violations) > 0: ## In 'report' mode, the rest of the file is still validated but nothing else is written
+                continue
+            with record_stage('write'):
+                parquet_output.write(table.cast(arrow_schema))
+            record_rows(rows_out=len(table))
+    except BaseException:
+        parquet_output.abort()
+        raise
+    if len(violations) > 0:
+        parquet_output.abort()
+        write_validation_report(file, violations)
+        return False
+    with record_stage('write'):
+        parquet_output.close()
+    return True
+
+## ParquetOutput writes Arrow tables to a .parquet file (or, with partition columns, to a folder of hive-style partitions) with the parquet options; everything is written to a temporary path first and only moved to the real path by close, so a failure partway through never leaves a half-written output behind
+class ParquetOutput:
+    def __init__(self, file, path, parquet_options, arrow_schema): ## file is the .csv file name (for messages); arrow_schema is the schema of the empty output written when no rows are written
+        self.file = file
+        self.path = path
+        self.parquet_options = parquet_options
+        self.arrow_schema = arrow_schema
+        self.temp_path = get_temp_path(path)
+        remove_stale_temp_outputs(path)
+        self.writer = None
+        self.partition_writers = {} ## Partition folder -> the writer of its .parquet file, kept open across chunks
+        self.writer_arguments = None
+        self.partition_columns = None
+        self.tables_written = 0
+
+    def write(self, table):
+        if self.writer_arguments is None: ## The dictionary columns are chosen from the cardinality of the first table that is written
+            self.writer_arguments = get_parquet_writer_arguments(table, self.parquet_options)
+            self.partition_columns = get_partition_columns(self.file, table.column_names, self.parquet_options)
+        if self.partition_columns:
+            self.write_partitions(table)
+        else:
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.temp_path, table.schema, **self.writer_arguments)
+            self.writer.write_table(table, row_group_size=self.parquet_options['row_group_size'])
+        self.tables_written += 1
+
+    def write_partitions(self, table): ## Every partition has one .parquet file whose writer stays open until close, so a csv file written in chunks still gets one file per partition instead of one per chunk and partition
+        directories = get_partition_directories(table, self.partition_columns).dictionary_encode()
+        data = table.drop_columns(self.partition_columns)
+        for i, directory in enumerate(directories.dictionary.to_pylist()):
+            if directory not in self.partition_writers:
+                os.makedirs(os.path.join(self.temp_path, directory), exist_ok=True)
+                self.partition_writers[directory] = pq.ParquetWriter(os.path.join(self.temp_path, directory, 'part-0.parquet'), data.schema, **self.writer_arguments)
+            self.partition_writers[directory].write_table(data.filter(pc.equal(directories.indices, i)), row_group_size=self.parquet_options['row_group_size'])
+
+    def close(self): ## Moves the written output to its path, replacing the output of the last run
+        if self.writer is None and not self.partition_writers: ## Nothing was written (e.g. the csv file only had junk rows), so the output is empty
+            self.writer = pq.ParquetWriter(self.temp_path, self.arrow_schema, **get_parquet_writer_arguments(self.arrow_schema.empty_table(), self.parquet_options))
+        self.close_writers()
+        if self.partition_writers: ## The schema of the whole table (partition columns included) is kept in _common_metadata, so the partition columns are read back with their own types instead of as strings
+            pq.write_metadata(self.arrow_schema, os.path.join(self.temp_path, '_common_metadata'))
+        replace_parquet_output(self.temp_path, self.path)
+
+    def abort(self): ## Removes everything that was written
+        self.close_writers()
+        remove_parquet_output(self.temp_path)
+
+    def close_writers(self):
+        if self.writer is not None:
+            self.writer.close()
+        for i in self.partition_writers.values():
+            i.close()
+
+## get_partition_directories takes in an Arrow table and its partition columns and returns the hive-style partition folder ('column=value/column=value') of every row; Date values are written as YYYY-MM-DD, null values as HIVE_NULL_PARTITION, and the other values are URI-encoded like pyarrow and Spark do
+def get_partition_directories(table, partition_columns):
+    segments = []
+    for i in partition_columns:
+        column = table[i].combine_chunks()
+        values = pc.strftime(column, format='%Y-%m-%d') if pa.types.is_timestamp(column.type) else pc.cast(column, pa.string())
+        values = values.dictionary_encode()
+        keys = pa.array([i + '=' + urllib.parse.quote(j, safe='') for j in values.dictionary.to_pylist()], pa.string())
+        segments.append(pc.fill_null(pc.take(keys, values.indices), i + '=' + HIVE_NULL_PARTITION))
+    return pc.binary_join_element_wise(*segments, '/')
+
+## get_parquet_writer_arguments takes in the first Arrow table that is written and the parquet options and returns the keyword arguments of the pyarrow .parquet writer
+def get_parquet_writer_arguments(table, parquet_options):
+    writer_arguments = {'compression': parquet_options['compression'],
+                        'compression_level': parquet_options['compression_level'],
+                        'use_dictionary': get_dictionary_columns(table, parquet_options['dictionary_columns']),
+                        'write_statistics': parquet_options['write_statistics']}
+    if parquet_options['data_page_size'] is not None:
+        writer_arguments['data_page_size'] = parquet_options['data_page_size']
+    return writer_arguments
+
+## get_dictionary_columns takes in an Arrow table and the dictionary_columns option and returns the columns that are dictionary-encoded; in 'auto' mode, a column is dictionary-encoded if its values repeat (at most half as many distinct values as non-null values) and it has at most DICTIONARY_MAX_DISTINCT_VALUES distinct values, so high-cardinality columns like id do not pay for a dictionary that gets thrown away; in streaming mode the table is the first chunk, so a column whose values only start to repeat (or stop repeating) later in the file is judged by its first chunk (pyarrow still falls back to plain encoding when a dictionary grows past its page size limit)
+def get_dictionary_columns(table, dictionary_columns):
+    if dictionary_columns != 'auto':
+        return dictionary_columns
+    columns = []
+    for i in table.column_names:
+        non_null_count = len(table[i]) - table[i].null_count
+        distinct_count = pc.count_distinct(table[i], mode='only_valid').as_py()
+        if non_null_count > 0 and distinct_count <= DICTIONARY_MAX_DISTINCT_VALUES and distinct_count * 2 <= non_null_count:
+            columns.append(i)
+    return columns
+
+## get_partition_columns takes in the .csv file name, the column names of the output, and the parquet options and returns the partition columns that are in the output; a partition column that is not in the schema of the csv file is ignored with a warning
+def get_partition_columns(file, columns, parquet_options):
+    partition_columns = []
+    for i in parquet_options['partition_columns']:
+        if i in columns:
+            partition_columns.append(i)
+        else:
+            output_message("WARNING: The '" + i + "' partition column is not in the schema .txt file or the csv data of the '" + file + "' file. The parquet output will not be partitioned by the '" + i + "' column.")
+    if len(partition_columns) == len(columns) and len(columns) > 0: ## At least one column has to be left in the .parquet files
+        output_message("WARNING: Every column of the '" + file + "' file is a partition column. The parquet output will not be partitioned by the '" + partition_columns[-1] + "' column.")
+        partition_columns = partition_columns[:-1]
+    return partition_columns
+
+## remove_parquet_output takes in the path of a .parquet file or of a folder of partitions and removes it if it exists
+def remove_parquet_output(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+## replace_parquet_output takes in the temporary path an output was written to and its real path and moves the output to its real path, replacing the output of the last run
+def replace_parquet_output(temp_path, path):
+    if os.path.isdir(path) or (os.path.isdir(temp_path) and os.path.exists(path)): ## os.replace cannot replace a folder, or replace a file with a folder
+        remove_parquet_output(path)
+    os.replace(temp_path, path)
+
+## get_temp_path takes in the path of an output and returns the temporary path it is written to before it is renamed; the process id is in the name, so two processes writing the same output never write to the same temporary path, and the temporary outputs of killed processes can be found (see remove_stale_temp_outputs)
+def get_temp_path(path):
+    return path + "." + str(os.getpid()) + ".tmp"
+
+## remove_stale_temp_outputs takes in the path of an output and removes the temporary outputs of that path left behind by processes that were killed while writing them
+def remove_stale_temp_outputs(path):
+    for i in glob.glob(glob.escape(path) + ".*.tmp"):
+        pid = i[len(path) + 1:-len(".tmp")]
+        if pid.isdigit() and not is_process_running(int(pid)):
+            remove_parquet_output(i)
+
+## is_process_running takes in a process id and returns whether the process is still running
+def is_process_running(pid):
+    if os.name == 'nt': ## os.kill stops the process on Windows, so the temporary output is kept
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError: ## The process belongs to another user
+        return True
+    return True
+
+## process_file_incrementally takes in a list where the 0th index is a .csv file and the 1st index is a .txt file for the csv's schema and the options dictionary and only processes the file if it changed since it was last processed, based on the manifest stored next to the .parquet file
+## If the csv file and its schema have not changed, the existing .parquet file is returned as a LazyParquet; if rows were only appended to the csv file, only the new rows are processed and written to a new part file; otherwise the whole file is processed again
+def process_file_incrementally(file, options):
+    manifest_path = get_manifest_path(file[0])
+    manifest = read_manifest(manifest_path)
+    schema_hash = get_file_hash(file[1])[1]
+    csv_stat = os.stat(file[0])
+    if manifest is not None and manifest['schema_hash'] == schema_hash and manifest['engine'] == options['engine'] and manifest.get('parquet_options') == options['parquet_options'] and manifest.get('filters', []) == options['filters'] and all(os.path.exists(i) for i in manifest['output_files']):
+        if csv_stat.st_size == manifest['csv_size'] and csv_stat.st_mtime_ns == manifest['csv_mtime_ns']:
+            output_message("The '" + file[0] + "' file and the '" + file[1] + "' schema .txt file have not changed since they were last processed. The existing parquet file will be used.............................................................")
+            return LazyParquet(manifest['output_files'])
+        if csv_stat.st_size >= manifest['csv_size']:
+            prefix_hash, csv_hash = get_file_hash(file[0], manifest['csv_size'])
+            if prefix_hash == manifest['csv_hash'] and csv_stat.st_size == manifest['csv_size']: ## Only the modification time changed
+                write_manifest(manifest_path, dict(manifest, csv_mtime_ns=csv_stat.st_mtime_ns))
+                output_message("The '" + file[0] + "' file and the '" + file[1] + "' schema .txt file have not changed since they were last processed. The existing parquet file will be used.............................................................")
+                return LazyParquet(manifest['output_files'])
+            if prefix_hash == manifest['csv_hash'] and options['engine'] != 'spark' and manifest.get('rows') is not None and ends_with_new_line(file[0], manifest['csv_size']): ## Rows were only appended to the csv file
+                recorded_rows = get_recorded_rows()
+                part_path = append_csv_tail(file, manifest, options)
+                if part_path is None:
+                    return None
+                rows = None if recorded_rows is None else manifest['rows'] + get_recorded_rows()[0] - recorded_rows[0]
+                write_manifest(manifest_path, dict(manifest, csv_size=csv_stat.st_size, csv_mtime_ns=csv_stat.st_mtime_ns, csv_hash=csv_hash, rows=rows, output_files=manifest['output_files'] + [part_path]))
+                return LazyParquet(manifest['output_files'] + [part_path])
+    csv_hash = get_file_hash(file[0])[1]
+    recorded_rows = get_recorded_rows()
+    result = process_file(file, dict(options, incremental=False))
+    if result is None:
+        return None
+    rows = None if recorded_rows is None or options['engine'] == 'spark' else get_recorded_rows()[0] - recorded_rows[0] ## The number of data rows of the csv file, so the rows appended later are numbered after them (None if it is not known, and the whole file is then processed again when rows are appended)
+    parquet_path = "../output_files/" + get_parquet_file_name(file[0])
+    if manifest is not None: ## Removing the part files of the rows that were appended before, since the whole file was processed again
+        for i in manifest['output_files']:
+            if i != parquet_path:
+                remove_parquet_output(i)
+    write_manifest(manifest_path, {'csv_file': file[0], 'csv_size': csv_stat.st_size, 'csv_mtime_ns': csv_stat.st_mtime_ns, 'csv_hash': csv_hash, 'schema_file': file[1], 'schema_hash': schema_hash, 'engine': options['engine'], 'parquet_options': options['parquet_options'], 'filters': options['filters'], 'rows': rows, 'output_files': [parquet_path]})
+    return result
+
+## append_csv_tail takes in the file's list, the manifest of the file, and the options dictionary and processes only the rows after the bytes that were processed before, writing them to a new part file; returns the path of the part file or None
+def append_csv_tail(file, manifest, options):
+    schema = get_compiled_schema(file[1])
+    output_message("Processing the rows appended to the '" + file[0] + "' file.............................................................")
+    region = detect_data_region(file[0])
+    projection = None
+    if region is not None: ## The header is found in the first few KB of the file and the junk rows at the end of the file are not read
+        columns, schema, width, columns_to_keep, start_offset = get_region_columns(file[0], schema, region)
+        end_offset = max(region.data_end, manifest['csv_size'])
+        projection = None if columns is None else get_projection(columns, columns_to_keep, region)
+    else:
+        columns, schema, width, columns_to_keep, first_chunk = get_streaming_columns(file[0], schema, read_csv_chunks(file[0], options['chunk_size'])) ## The header is read from the start of the file
+        end_offset = None
+    if columns is None:
+        return None
+    part_path = "../output_files/" + get_parquet_file_name(file[0]).split('.parquet')[0] + " - Part " + str(len(manifest['output_files'])) + ".parquet"
+    chunks = read_python_tables(file[0], width, manifest['csv_size'], end_offset, options['chunk_size'], projection) ## The appended rows are usually few, so they are always read by the python reader
+    if not write_chunks_to_parquet(file[0], chunks, columns, columns_to_keep, schema, part_path, options['validation'], options['parquet_options'], projection, options['filters'], manifest['rows']): ## The appended rows are numbered after the rows processed before, the same as when the whole file is processed
+        return None
+    output_message("The rows appended to the '" + file[0] + "' file have been successfully processed and the '" + os.path.basename(part_path) + "' file has been created.............................................................")
+    return part_path
+
+## get_manifest_path takes in the .csv file name and returns the path of the manifest stored next to its .parquet file
+def get_manifest_path(file):
+    return "../output_files/" + file.split('.csv')[0] + " - Manifest.json"
+
+## read_manifest takes in the path of a manifest and returns the manifest as a dictionary, or None if there is no manifest
+def read_manifest(manifest_path):
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+## write_manifest takes in the path of a manifest and the manifest dictionary and writes the manifest
+def write_manifest(manifest_path, manifest):
+    temp_path = get_temp_path(manifest_path)
+    remove_stale_temp_outputs(manifest_path)
+    with open(temp_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=4)
+    os.replace(temp_path, manifest_path)
+
+## get_file_hash takes in a file name and a number of bytes and returns the SHA-256 hash of the first prefix_size bytes (None if prefix_size is None) and of the whole file, reading the file only once
+def get_file_hash(file, prefix_size=None):
+    file_hash = hashlib.sha256()
+    prefix_hash = None
+    with record_stage('hash'), open(file, 'rb') as hashed_file:
+        if prefix_size is not None:
+            remaining = prefix_size
+            while remaining > 0:
+                block = hashed_file.read(min(HASH_BLOCK_SIZE, remaining))
+                if len(block) == 0:
+                    break
+                file_hash.update(block)
+                remaining -= len(block)
+            prefix_hash = file_hash.hexdigest()
+        for block in iter(lambda: hashed_file.read(HASH_BLOCK_SIZE), b''):
+            file_hash.update(block)
+    return prefix_hash, file_hash.hexdigest()
+
+## ends_with_new_line takes in a file name and a number of bytes and returns whether the first size bytes of the file end with a new line, so that rows appended after them start on a new line
+def ends_with_new_line(file, size):
+    if size == 0:
+        return False
+    with open(file, 'rb') as csv_file:
+        csv_file.seek(size - 1)
+        return csv_file.read(1) == b'\n'
+
+## BatchJournal records the outcome of every (csv, schema) pair of a batch in a JSON lines file: 'completed' (with the outputs that were written), 'failed' (with the reason and the number of attempts), or 'skipped' (with the reason); each line is written to disk before the next file is recorded, so the journal survives the process being killed, and a batch that is run again with the same journal only processes the pairs that were not completed
+## A pair is only resumed if its csv file and schema .txt file have the same size and modification time as when it was completed, its outputs still exist, and the batch has the same settings (engine, parquet options, and schema inference)
+class BatchJournal:
+    def __init__(self, path, settings):
+        self.path = path
+        self.settings = settings
+        self.entries = {} ## The keys will be the csv file and the schema .txt file of the pairs; the values will be the last entry of the pair
+        if os.path.isfile(path):
+            with open(path) as journal_file:
+                for line in journal_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError: ## The last line is cut off if the process was killed while writing it
+                        continue
+                    self.entries[(entry['csv_file'], entry['schema_file'])] = entry
+
+    def get_completed_entry(self, file): ## Returns the entry of the pair if it can be resumed, or None if it needs to be processed
+        entry = self.entries.get((file[0], file[1]))
+        if entry is None or entry['status'] not in ('completed', 'skipped') or len(entry['outputs']) == 0:
+            return None
+        if entry['settings'] != self.settings or entry['fingerprint'] != get_pair_fingerprint(file) or not all(os.path.exists(i) for i in entry['outputs']):
+            return None
+        return entry
+
+    def record(self, file, status, reason=None, attempts=0, outputs=None):
+        entry = {'time': time.time(), 'csv_file': file[0], 'schema_file': file[1], 'status': status, 'reason': reason, 'attempts': attempts, 'outputs': outputs or [], 'fingerprint': get_pair_fingerprint(file), 'settings': self.settings}
+        with open(self.path, 'a') as journal_file:
+            journal_file.write(json.dumps(entry) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        self.entries[(file[0], file[1])] = entry
+
+    def record_result(self, file, result, file_metrics): ## Records the result and FileMetrics of a file that was processed
+        if result is None:
+            self.record(file, 'failed', file_metrics.error or "The file could not be processed.", file_metrics.attempts)
+        else:
+            self.record(file, 'completed', None, file_metrics.attempts, file_metrics.outputs)
+
+## get_pair_fingerprint takes in the file's list and returns the size and modification time of the csv file and of the schema .txt file (None for a file that does not exist)
+def get_pair_fingerprint(file):
+    fingerprint = []
+    for i in file[:2]:
+        try:
+            file_stat = os.stat(i)
+            fingerprint.append([file_stat.st_size, file_stat.st_mtime_ns])
+        except OSError:
+            fingerprint.append(None)
+    return fingerprint
+
+## ConversionSession holds the Spark session of the 'spark' engine and the 'spark' reader so that it is configured once and reused by every file of every csv_to_parquet call it is passed to; Spark is only started when a file needs it (or by warm_up) and is shut down by stop
+## driver_memory and executor_memory are Spark memory sizes (e.g. '8g'), shuffle_partitions is the number of partitions of Spark shuffles, and spark_conf has any other Spark settings; they only apply if Spark is not already running in the process
+## startup_seconds has the seconds it took to import the dependencies ('imports', measured by warm_up) and to start Spark ('spark'); the 'startup' stage of the FileMetrics of each file has the time it waited for Spark, so the first file shows the cold start and the next files the warm start
+class ConversionSession:
+    def __init__(self, app_name="csv_to_parquet", driver_memory=None, executor_memory=None, shuffle_partitions=None, spark_conf=None):
+        self.app_name = app_name
+        self.spark_conf = dict(spark_conf or {})
+        if driver_memory is not None:
+            self.spark_conf['spark.driver.memory'] = driver_memory
+        if executor_memory is not None:
+            self.spark_conf['spark.executor.memory'] = executor_memory
+        if shuffle_partitions is not None:
+            self.spark_conf['spark.sql.shuffle.partitions'] = shuffle_partitions
+        self.spark = None
+        self.startup_seconds = {}
+
+    def get_spark(self): ## Returns the Spark session, starting it the first time it is called
+        if self.spark is None:
+            start = time.perf_counter()
+            builder = pyspark_sql.SparkSession.builder.appName(self.app_name)
+            for key, value in self.spark_conf.items():
+                builder = builder.config(key, str(value))
+            self.spark = builder.getOrCreate()
+            self.startup_seconds['spark'] = time.perf_counter() - start
+        return self.spark
+
+    def warm_up(self, spark=False): ## Imports the dependencies (and starts Spark if spark is True) before the first file is processed; returns startup_seconds
+        start = time.perf_counter()
+        for i in (pd, ds, dateutil_parser):
+            i.load()
+        self.startup_seconds['imports'] = time.perf_counter() - start
+        if spark:
+            self.get_spark()
+        return dict(self.startup_seconds)
+
+    def stop(self): ## Shuts Spark down; it is started again if the session is used after this
+        if self.spark is not None:
+            self.spark.stop()
+            self.spark = None
+            self.startup_seconds.pop('spark', None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def __getstate__(self): ## A session sent to a worker process starts its own Spark with the same settings
+        return dict(self.__dict__, spark=None)
+
+DEFAULT_SESSION = ConversionSession() ## The session used when csv_to_parquet is not given one; Spark keeps running until DEFAULT_SESSION.stop() is called
+
+## LazyParquet represents .parquet files whose DataFrame is only built when their data is used; it is returned for csv files that did not have to be processed again and, with return_type='lazy', for converted files whose Arrow table is still in memory
+class LazyParquet:
+    def __init__(self, paths, table=None): ## table is the Arrow table of the .parquet files if it is already in memory
+        self.paths = paths
+        self.table = table
+        self.df = None
+
+    def to_pandas(self): ## Builds the DataFrame (from the Arrow table, or by reading the .parquet files) the first time it is called
+        if self.df is None and self.table is not None:
+            self.df = self.table.to_pandas(types_mapper=get_pandas_types().get)
+        elif self.df is None:
+            self.df = pd.concat([pd.read_parquet(i, schema=read_output_schema(i)) for i in self.paths], ignore_index=True)
+        return self.df
+
+    def to_arrow(self):
+        if self.table is not None:
+            return self.table
+        return pa.concat_tables([pq.read_table(i, schema=read_output_schema(i)) for i in self.paths])
+
+    def __len__(self): ## The number of rows is read from the .parquet metadata without reading the data
+        if self.table is not None:
+            return len(self.table)
+        return sum(ds.dataset(i, partitioning='hive').count_rows() for i in self.paths)
+
+    def __getitem__(self, key):
+        return self.to_pandas()[key]
+
+    def __getattr__(self, name): ## Everything else is looked up on the DataFrame
+        if name.startswith('__') or name in ('paths', 'table', 'df'): ## Needed so a LazyParquet can be pickled from a worker process
+            raise AttributeError(name)
+        return getattr(self.to_pandas(), name)
+
+## read_output_schema takes in the path of a .parquet file or of a folder of partitions and returns the schema kept in the folder's _common_metadata file, or None (the schema of the .parquet files is used) if there is none
+def read_output_schema(path):
+    metadata_path = os.path.join(path, '_common_metadata')
+    if not os.path.isfile(metadata_path):
+        return None
+    return pq.read_schema(metadata_path)
+
+## spark_csv_to_parquet takes in the .csv file name, the schema dictionary, the validation mode, the parquet options, the ConversionSession, and the row filters and finds the header, removes the junk rows and the rows that do not match the row filters, converts the columns, checks the nullability rules, and writes the .parquet files with Spark DataFrame operations only; returns a Spark DataFrame of the created .parquet files or None
+def spark_csv_to_parquet(file, schema, validation='fail_fast', parquet_options=None, session=None, row_filters=None):
+    with record_stage('startup'):
+        spark = (session or DEFAULT_SESSION).get_spark()
+    spark_file = spark.read.csv(file)
+    raw_columns = spark_file.columns
+    spark_file = spark_file.withColumn('_row_id', F.monotonically_increasing_id()) ## The row ids increase in the same order as the rows of the csv file
+    region = detect_data_region(file)
+    if region is not None: ## The first row and the header are found from the first few KB of the file instead of sorting the whole file to find them
+        candidate_rows = normalize_rows([region.prefix_rows[0], region.header], len(raw_columns))
+    else:
+        first_row = spark_file.orderBy('_row_id').first()
+        if first_row is None: ## Empty csv file
+            output_message("ERROR: The '" + file + "' file does not have any data. The '" + file + "' file cannot be processed.")
+            return None
+        header_row = spark_file.dropna(how='any', subset=raw_columns).orderBy('_row_id').first() ## The first row where every column has a value will be the headers (column names)
+        candidate_rows = [['' if v is None else v for v in list(i)[:-1]] for i in [first_row, header_row] if i is not None]
+    columns, schema = get_columns_and_new_schema(file, schema, candidate_rows)
+    if columns is None and schema is None:
+        return None
+    columns_to_keep = check_if_columns_in_csv_not_in_schema(get_raw_data([], columns), file, schema).column_names
+    row_filters = get_row_filters(file, row_filters or [], schema)
+    if row_filters is None:
+        return None
+
+    raw_data = get_spark_data_rows(spark_file, raw_columns, columns)
+    row_number_columns = []
+    if validation == 'report': ## The data rows are numbered from 1 before the row filters, so the validation report has the same row numbers as the other engines (the row ids are not consecutive)
+        raw_data = raw_data.withColumn('_row_number', F.row_number().over(pyspark_sql.Window.orderBy('_row_id')))
+        row_number_columns = ['_row_number']
+    raw_data = raw_data.select(['_row_id'] + row_number_columns + [F.col(raw_columns[columns.index(i)]).alias(i) for i in columns_to_keep])
+    if len(row_filters) > 0:
+        raw_data = raw_data.filter(get_spark_row_filter(row_filters, schema))
+    raw_data = raw_data.persist(pyspark.StorageLevel.MEMORY_AND_DISK) ## Persisting so the csv file is only parsed once for the checks and the write
+
+    spark_columns = {} ## The keys will be the column names; the values will be the converted column, whether each value cannot be converted, the 'Invalid Conversion' strings, and whether each value has a decimal
+    checks = [] ## The first invalid value, the number of decimal values, and whether there are null values are found for every column in one pass over the data
+    for i in columns_to_keep:
+        value, invalid, marker, decimal = spark_columns[i] = get_spark_column(F.col(i), schema[i])
+        checks.append(F.min(F.when(invalid, F.struct(F.col('_row_id'), marker.alias('marker')))).alias(i + '_invalid'))
+        checks.append(F.sum(F.when(decimal, 1).otherwise(0)).alias(i + '_decimal_count'))
+        checks.append(F.first(F.when(decimal, F.col(i)), ignorenulls=True).alias(i + '_decimal_example'))
+        checks.append(F.max(F.when(value.isNull(), 1).otherwise(0)).alias(i + '_has_nulls'))
+    with record_stage('checks'):
+        check_results = raw_data.agg(*checks).first()
+    for i in columns_to_keep:
+        if check_results[i + '_decimal_count']: ## If an Integer value is numerical but has a decimal in it - convert decimal to int
+            output_message("WARNING: The '" + i + "' column in the '" + file + "' file has " + str(check_results[i + '_decimal_count']) + " values with decimals (such as " + check_results[i + '_decimal_example'] + ") and the schema .txt file says the '" + i + "' column is an Integer. They will be converted to integers.")
+    if validation == 'report' and any(check_results[i + '_invalid'] is not None or (check_results[i + '_has_nulls'] and not schema[i].nullable) for i in columns_to_keep):
+        write_validation_report(file, get_spark_violations(raw_data, columns_to_keep, schema, spark_columns))
+        raw_data.unpersist()
+        return None
+    for i in columns_to_keep:
+        if check_results[i + '_invalid'] is not None:
+            output_message("ERROR: The '" + i + "' column has a value of '" + check_results[i + '_invalid']['marker'].split('-')[0] + "' which cannot be converted to " + schema[i].data_type.value + ". The '" + file + "' file cannot be processed.")
+            raw_data.unpersist()
+            return None
+    for i in columns_to_keep:
+        if check_results[i + '_has_nulls'] and not schema[i].nullable:
+            output_message("ERROR: The '" + i + "' column in the '" + file + "' file has null values when the schema .txt file says it cannot have null values. The '" + file + "' file cannot be processed.")
+            raw_data.unpersist()
+            return None
+    parquet_file = get_parquet_file_name(file)
+    parquet_options = parquet_options or DEFAULT_PARQUET_OPTIONS ## Spark sizes row groups and pages in bytes and chooses the dictionary encoding itself, so only the compression and the partitioning are passed on
+    spark_writer = raw_data.select([spark_columns[i][0].alias(i) for i in columns_to_keep]).write.mode('overwrite').option('compression', parquet_options['compression'])
+    if parquet_options['compression_level'] is not None and parquet_options['compression'] == 'zstd':
+        spark_writer = spark_writer.option('parquet.compression.codec.zstd.level', str(parquet_options['compression_level']))
+    partition_columns = get_partition_columns(file, columns_to_keep, parquet_options)
+    if partition_columns:
+        spark_writer = spark_writer.partitionBy(*partition_columns)
+    temp_path = get_temp_path("../output_files/" + parquet_file)
+    remove_stale_temp_outputs("../output_files/" + parquet_file)
+    with record_stage('write'):
+        try:
+            spark_writer.parquet(temp_path) ## Each executor writes its own part files to the temporary folder, which replaces the output once every part file is written
+        except Exception:
+            remove_parquet_output(temp_path)
+            raise
+        replace_parquet_output(temp_path, "../output_files/" + parquet_file)
+    raw_data.unpersist()
+    output_message("The '" + file + "' file has been successfully processed and the '" + parquet_file + "' file has been created.............................................................")
+    return spark.read.parquet("../output_files/" + parquet_file)
+
+## get_spark_data_rows takes in the Spark DataFrame of a csv file, its raw column names, and the Column Names and returns the Spark DataFrame without the rows that are empty, only have one column filled, or are the header
+def get_spark_data_rows(spark_file, raw_columns, columns):
+    empty_count = sum([F.when(F.col(i).isNull(), 1).otherwise(0) for i in raw_columns])
+    is_header = F.lit(True)
+    for raw_column, column in zip(raw_columns, columns):
+        is_header = is_header & F.col(raw_column).eqNullSafe(column)
+    return spark_file.filter((empty_count < len(raw_columns) - 1) & ~is_header)
+
+## get_spark_row_filter takes in the row filters and the schema dictionary and returns the Spark condition of the rows that are kept: the rows that match every row filter, and the rows with a value in a column of the row filters that cannot be converted, so that value is still reported by the checks
+def get_spark_row_filter(row_filters, schema):
+    spark_types = {DataType.INTEGER: 'long', DataType.DOUBLE: 'double', DataType.STRING: 'string', DataType.DATE: 'timestamp_ntz'}
+    condition = F.lit(True)
+    invalid = F.lit(False)
+    for column, comparison, value in row_filters:
+        values, column_invalid, marker, decimal = get_spark_column(F.col(column), schema[column])
+        spark_type = spark_types[schema[column].data_type]
+        if comparison in ('in', 'not in'):
+            matches = values.isin([F.lit(i).cast(spark_type) for i in value])
+            if comparison == 'not in':
+                matches = ~matches
+        else:
+            matches = ROW_FILTER_COMPARISONS[comparison][1](values, F.lit(value).cast(spark_type))
+        condition = condition & F.coalesce(matches, F.lit(False))
+        invalid = invalid | F.coalesce(column_invalid, F.lit(False))
+    return condition | invalid
+
+## get_spark_violations takes in the raw Spark DataFrame (with the '_row_number' of every data row), the column names, the schema dictionary, and the converted Spark columns and returns the list of violations for the validation report
+def get_spark_violations(raw_data, columns, schema, spark_columns):
+    violations = None
+    for position, i in enumerate(columns):
+        value, invalid, marker, decimal = spark_columns[i]
+        invalid = F.coalesce(invalid, F.lit(False))
+        column_violations = raw_data.filter(invalid).select(F.lit(i).alias('column'), F.col('_row_number').alias('row'), F.col(i).alias('value'), F.lit('cannot be converted to ' + schema[i].data_type.value).alias('violation'), F.lit(position).alias('_position'))
+        if not schema[i].nullable:
+            column_violations = column_violations.unionByName(raw_data.filter(value.isNull() & ~invalid).select(F.lit(i).alias('column'), F.col('_row_number').alias('row'), F.col(i).alias('value'), F.lit('null value in a column that cannot have null values').alias('violation'), F.lit(position).alias('_position')))
+        violations = column_violations if violations is None else violations.unionByName(column_violations)
+    return [i.asDict() for i in violations.orderBy('row', '_position').drop('_position').collect()] ## The violations of a row are in the order of the columns
+
+## get_spark_column takes in a Spark column of raw values and the column's ColumnSpec and returns the converted column, whether each value cannot be converted, the 'Invalid Conversion' string for each value (the same as get_column_values), and whether each value is an Integer with a decimal in it
+def get_spark_column(column, column_spec):
+    if column_spec.data_type == DataType.DOUBLE or column_spec.data_type == DataType.INTEGER:
+        numeric = column.rlike(NUMERIC_PATTERN)
+        invalid = column.isNotNull() & ~numeric ## If there is a non-numerical value
+        marker = F.concat(column, F.lit('-Invalid Conversion'))
+        if column_spec.data_type == DataType.DOUBLE:
+            return F.when(numeric, column.cast('double')), invalid, marker, F.lit(False)
+        decimal = numeric & column.contains('.')
+        return F.when(decimal, column.cast('double').cast('long')).when(numeric, column.cast('long')), invalid, marker, decimal ## Casting a double to a long truncates it the same way int(float(value)) does
+    elif column_spec.data_type == DataType.STRING:
+        return F.when(F.lower(column) != 'n/a', column), column.contains('Invalid Conversion'), column, F.lit(False)
+    standardized = get_spark_date_standardizer(column_spec.schema_lst)(column) ## Date columns are standardized by a pandas UDF so the rules are the same as get_column_values
+    invalid = standardized.contains('Invalid Conversion')
+    return F.when(~invalid, F.to_date(standardized, 'yyyy-MM-dd').cast('timestamp_ntz')), invalid, standardized, F.lit(False)
+
+## get_spark_date_standardizer takes in the list from the schema dictionary that represents a Date column and returns a pandas UDF that standardizes a batch of raw values and returns them as 'YYYY-MM-DD' strings (or the 'Invalid Conversion' strings from get_column_values)
+def get_spark_date_standardizer(schema_lst):
+    @F.pandas_udf('string')
+    def standardize_dates(values: pd.Series) -> pd.Series:
+        standardized_values = get_standardized_date_values(pd.unique(values.dropna()), schema_lst)
+        return values.map(lambda v: None if pd.isna(v) or standardized_values[v] is None else str(standardized_values[v]))
+    return standardize_dates
+
+## read_csv_chunks takes in the .csv file name, the number of rows per chunk, and the byte offset to start reading from and yields nested lists of at most chunk_size rows
+def read_csv_chunks(file, chunk_size, start_offset=0, end_offset=None):
+    with open(file, 'rb') as binary_file:
+        binary_file.seek(start_offset)
+        if end_offset is None:
+            csv_file = io.TextIOWrapper(binary_file, newline='', encoding='utf-8')
+        else: ## Only the lines before end_offset are read
+            csv_file = read_lines_until(binary_file, start_offset, end_offset)
+        chunk = []
+        for row in csv.reader(csv_file):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk
+
+## read_lines_until takes in a binary file, the byte offset it is at, and the byte offset to stop at and yields the decoded lines of the file until the stop offset
+def read_lines_until(binary_file, offset, end_offset):
+    for line in binary_file:
+        if offset >= end_offset:
+            return
+        offset += len(line)
+        yield line.decode('utf-8')
+
+## read_python_tables takes in the .csv file name, the row width, the byte offsets to start and stop reading at, the number of rows per chunk (None for the whole range at once), and the positions of the columns to parse (None for every column) and yields raw Arrow tables read by the csv module; every row is padded or cut to the row width, the same way Spark fills missing values with nulls; when only some columns are parsed, the rows that are empty or only have one column filled are removed from the whole row first, so every row of the tables is a data row or the header (see filter_projected_table)
+def read_python_tables(file, width, start_offset=0, end_offset=None, chunk_size=None, columns=None):
+    for chunk in read_csv_chunks(file, chunk_size or sys.maxsize, start_offset, end_offset):
+        if columns is None:
+            yield rows_to_table(normalize_rows(chunk, width), width)
+            continue
+        chunk = [row for row in chunk if len(row) - row.count('') > 1]
+        yield rows_to_table(normalize_rows(chunk, width), width, columns).replace_schema_metadata(CLASSIFIED_ROWS_METADATA)
+
+## read_arrow_tables takes in the same arguments as read_python_tables and yields raw Arrow tables parsed by pyarrow's multithreaded csv parser; the file is memory-mapped, so only the part being parsed is read from disk. pyarrow skips the rows that do not have exactly width values, which is fine for the junk rows (at most one value) but not for data rows, so IrregularRowsError is raised if there were any
+def read_arrow_tables(file, width, start_offset=0, end_offset=None, chunk_size=None, columns=None):
+    names = [str(i) for i in range(width)]
+    irregular_rows = []
+    def check_invalid_row(row):
+        try:
+            values = next(csv.reader([row.text]), [])
+        except csv.Error:
+            values = [row.text, row.text]
+        if len(values) - values.count('') > 1:
+            irregular_rows.append(row.text)
+        return 'skip'
+    read_options = pacsv.ReadOptions(column_names=names, use_threads=True)
+    parse_options = pacsv.ParseOptions(newlines_in_values=True, invalid_row_handler=check_invalid_row) ## Quoted values can span lines
+    convert_options = pacsv.ConvertOptions(column_types={i: pa.string() for i in names}, strings_can_be_null=False, quoted_strings_can_be_null=False, include_columns=None if columns is None else [names[i] for i in columns]) ## Every value is read as it is; empty values are '' like in the other readers; the columns that are not included are only split, never turned into Arrow arrays
+    with pa.memory_map(file) as source:
+        end_offset = source.size() if end_offset is None else end_offset
+        if end_offset <= start_offset: ## pyarrow does not read empty input
+            return
+        source.seek(start_offset)
+        data = pa.BufferReader(source.read_buffer(end_offset - start_offset))
+        if chunk_size is None:
+            tables = [pacsv.read_csv(data, read_options, parse_options, convert_options)]
+        else:
+            tables = rebatch(pacsv.open_csv(data, read_options, parse_options, convert_options), chunk_size)
+        for table in tables:
+            if len(irregular_rows) > 0:
+                raise IrregularRowsError(irregular_rows[0])
+            yield table
+    if len(irregular_rows) > 0: ## The last rows can be skipped after the last table was yielded (or without any table being left to yield)
+        raise IrregularRowsError(irregular_rows[0])
+
+## read_pandas_tables takes in the same arguments as read_python_tables and yields raw Arrow tables parsed by the pandas C parser; rows with fewer than width values are padded with '' and rows with more raise IrregularRowsError
+def read_pandas_tables(file, width, start_offset=0, end_offset=None, chunk_size=None, columns=None):
+    names = [str(i) for i in range(width)]
+    usecols = None if columns is None else [names[i] for i in columns]
+    arrow_schema = pa.schema([(i, pa.string()) for i in (usecols or names)])
+    with open(file, 'rb') as binary_file:
+        binary_file.seek(start_offset)
+        source = binary_file if end_offset is None else FileRange(binary_file, end_offset)
+        try:
+            frames = pd.read_csv(source, header=None, names=names, usecols=usecols, dtype=str, na_filter=False, skip_blank_lines=True, engine='c', encoding='utf-8', chunksize=chunk_size)
+            for frame in ([frames] if chunk_size is None else frames):
+                yield pa.Table.from_pandas(frame[arrow_schema.names], preserve_index=False).cast(arrow_schema)
+        except pd.errors.ParserError as error:
+            raise IrregularRowsError(str(error))
+
+CSV_READERS = {'python': read_python_tables, 'arrow': read_arrow_tables, 'pandas': read_pandas_tables} ## The readers that read a byte range of a csv file into raw Arrow tables; the Spark reader is separate because it always reads the whole file
+
+CLASSIFIED_ROWS_METADATA = {'csv_to_parquet.classified_rows': 'true'} ## The schema metadata of the projected tables whose rows were already checked against the whole csv row (see read_python_tables)
+
+## UnclassifiedRowsError is raised by filter_projected_table when a row has fewer than two of its parsed columns filled, so whether it is a data row depends on the columns that were not parsed; the file is then read again with every column
+class UnclassifiedRowsError(Exception):
+    pass
+
+## IrregularRowsError is raised by the arrow and pandas readers when a data row of the csv file does not have the same number of values as the header; the file is then read by the python reader, which pads or cuts every row
+class IrregularRowsError(Exception):
+    pass
+
+## FileRange wraps a binary file so that reading it stops at end_offset
+class FileRange:
+    def __init__(self, binary_file, end_offset):
+        self.binary_file = binary_file
+        self.end_offset = end_offset
+
+    def read(self, size=-1):
+        remaining = max(self.end_offset - self.binary_file.tell(), 0)
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self.binary_file.read(size)
+
+## rebatch takes in record batches and a number of rows and yields Arrow tables of chunk_size rows (the last one can have fewer)
+def rebatch(batches, chunk_size):
+    pending = []
+    pending_rows = 0
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunk_size:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunk_size)
+            pending = table.slice(chunk_size).to_batches()
+            pending_rows -= chunk_size
+    if pending_rows > 0:
+        yield pa.Table.from_batches(pending)
+
+## read_raw_table takes in the .csv file name, the reader, the row width, the byte offsets to start and stop reading at, and the positions of the columns to parse (None for every column) and returns the whole range as one raw Arrow table; if the reader finds data rows that have to be padded or cut, the range is read again by the python reader
+def read_raw_table(file, reader, width, start_offset=0, end_offset=None, columns=None):
+    try:
+        tables = list(CSV_READERS[reader](file, width, start_offset, end_offset, None, columns))
+    except IrregularRowsError:
+        output_irregular_rows_warning(file)
+        tables = list(read_python_tables(file, width, start_offset, end_offset, None, columns))
+    if len(tables) == 0:
+        return rows_to_table([], width, columns)
+    return pa.concat_tables(tables)
+
+## output_irregular_rows_warning takes in the .csv file name and warns that it is read again by the python reader
+def output_irregular_rows_warning(file):
+    output_message("WARNING: Some rows of the '" + file + "' file do not have the same number of values as its header. The '" + file + "' file will be read again by the python csv reader.")
+
+## DataRegion has where the data of a csv file is: the width of its rows, the complete rows in the first few KB of the file (padded to the width), the header (the first row where every column has a value, the same rule get_columns_and_new_schema uses), the byte offset right after the header, and the byte offset where the junk rows at the end of the file start
+class DataRegion:
+    __slots__ = ('width', 'prefix_rows', 'header', 'header_end', 'data_end')
+
+    def __init__(self, width, prefix_rows, header, header_end, data_end):
+        self.width = width
+        self.prefix_rows = prefix_rows
+        self.header = header
+        self.header_end = header_end
+        self.data_end = data_end
+
+## detect_data_region takes in the .csv file name and the number of bytes to scan and returns the DataRegion of the csv file from only its first and last scan_bytes bytes, or None if the header is not in the first scan_bytes bytes (the whole file is then scanned the way it was before)
+def detect_data_region(file, scan_bytes=DATA_REGION_SCAN_BYTES):
+    file_size = os.path.getsize(file)
+    with open(file, 'rb') as binary_file:
+        prefix = binary_file.read(scan_bytes)
+        suffix_offset = max(file_size - scan_bytes, 0)
+        binary_file.seek(suffix_offset)
+        suffix = binary_file.read()
+    try:
+        prefix_records = split_csv_records(prefix, file_size <= scan_bytes)
+    except (UnicodeDecodeError, csv.Error):
+        return None
+    width = max([len(row) for start, end, row in prefix_records], default=0)
+    prefix_rows = normalize_rows([row for start, end, row in prefix_records], width)
+    header_records = [(end, row) for (start, end, raw_row), row in zip(prefix_records, prefix_rows) if row.count('') == 0]
+    if width == 0 or len(header_records) == 0:
+        return None
+    header_end, header = header_records[0]
+    if suffix_offset > 0: ## The first line of the suffix is only part of a line
+        suffix = suffix[suffix.find(b'\n') + 1:] if b'\n' in suffix else b''
+    data_end = file_size
+    for line in reversed(suffix.splitlines(keepends=True)): ## Walking back from the end of the file over the rows that are empty or only have one column filled (e.g. "Total amount funded in policy code 1: 2160700")
+        if b'"' in line: ## A line with a quote could be the end of a quoted value that spans lines, so the walk stops there
+            break
+        try:
+            row = next(csv.reader([line.decode('utf-8')]), [])
+        except (UnicodeDecodeError, csv.Error):
+            break
+        if len(row) - row.count('') > 1:
+            break
+        data_end -= len(line)
+    return DataRegion(width, prefix_rows, header, header_end, max(data_end, header_end))
+
+## split_csv_records takes in the bytes at the start of a csv file and whether they are the whole file and returns the start offset, end offset, and parsed row of every complete record; a record only ends at a new line outside of quotes, so quoted values can span lines
+def split_csv_records(data, is_whole_file):
+    records = []
+    start = 0
+    position = 0
+    quotes = 0
+    while position < len(data):
+        new_line = data.find(b'\n', position)
+        if new_line == -1:
+            if not is_whole_file: ## The last line was cut off by the end of the scan
+                break
+            new_line = len(data) - 1
+        quotes += data.count(b'"', position, new_line + 1)
+        position = new_line + 1
+        if quotes % 2 == 0:
+            records.append((start, position, next(csv.reader([data[start:position].decode('utf-8')]), [])))
+            start = position
+            quotes = 0
+    return records
+
+## chain_chunks takes in the first chunk, the generator of the remaining chunks, and the row width and yields every chunk with its rows padded to the row width
+def chain_chunks(first_chunk, chunks, width):
+    yield first_chunk
+    for chunk in chunks:
+        yield normalize_rows(chunk, width)
+
+## normalize_rows takes in a nested list and a row width and returns the nested list where every row has exactly width values; missing values are ''
+def normalize_rows(rows, width):
+    return [i[:width] if len(i) >= width else i + [''] * (width - len(i)) for i in rows]
+
+## get_arrow_schema takes in the column names and the compiled schema and returns the pyarrow schema of the .parquet file so every row group has the same column types; the schema has the pandas metadata of the returned DataFrame so pandas reads the .parquet file back with the same data types
+def get_arrow_schema(columns, schema):
+    arrow_types = {DataType.INTEGER: pa.int64(), DataType.DOUBLE: pa.float64(), DataType.STRING: pa.string(), DataType.DATE: pa.timestamp('us')}
+    pandas_types = {DataType.INTEGER: pd.Int64Dtype(), DataType.DOUBLE: 'float64', DataType.STRING: pd.StringDtype(), DataType.DATE: 'datetime64[us]'}
+    pandas_metadata = pa.Schema.from_pandas(pd.DataFrame({i: pd.Series(dtype=pandas_types[schema[i].data_type]) for i in columns}), preserve_index=False).metadata
+    return pa.schema([(i, arrow_types[schema[i].data_type]) for i in columns], metadata=pandas_metadata)
 
 ## parse_schema_txt_file takes in the schema .txt file and returns a dictionary to represent the schema
 def parse_schema_txt_file(txt):
@@ -96,17 +1480,213 @@ def parse_schema_txt_file(txt):
     schema_file.close()
     return schema_dictionary
 
-## get_column_names_new_schema_original_file_content takes in the .csv file and the schema dictionary and returns the Column Names, New Schema, and Original File Content
-def get_column_names_new_schema_original_file_content(file, schema):
-    spark = SparkSession.builder.appName("csv_to_parquet").getOrCreate() ## Incorporating PySpark to read in .csv files to account for massive data inputs
-    spark_file = spark.read.csv(file) 
+## DataType has the data types that a column can have in the schema .txt file
+class DataType(Enum):
+    INTEGER = 'Integer'
+    DOUBLE = 'Double'
+    STRING = 'String'
+    DATE = 'Date'
+
+## ColumnSpec represents one column of a compiled schema; the converter of the column is resolved once when the schema is compiled instead of for every value
+class ColumnSpec:
+    __slots__ = ('name', 'data_type', 'nullable', 'date_standardization', 'schema_lst', 'converter')
+
+    def __init__(self, name, schema_lst): ## schema_lst is the list from the schema dictionary that represents the column
+        self.name = name
+        self.data_type = DataType(schema_lst[0])
+        self.nullable = schema_lst[1] != 'false'
+        self.date_standardization = len(schema_lst) > 2 and schema_lst[2] == 'true'
+        self.schema_lst = schema_lst
+        self.converter = COLUMN_CONVERTERS[self.data_type]
+
+COLUMN_CONVERTERS = {DataType.INTEGER: convert_integer_column, DataType.DOUBLE: convert_double_column, DataType.STRING: convert_string_column, DataType.DATE: convert_date_column} ## The converter of each data type
+
+COMPILED_SCHEMAS = {} ## The keys will be the absolute paths of the schema .txt files; the values will be the modification time and size of the file when it was compiled and the compiled schema
+
+## get_compiled_schema takes in the schema .txt file and returns a dictionary where the keys are the column names and the values are ColumnSpec objects, or None if a column has a data type that is not supported; each schema .txt file is only parsed and compiled again when it changes
+def get_compiled_schema(txt):
+    schema_stat = os.stat(txt)
+    cache_key = os.path.abspath(txt)
+    if cache_key in COMPILED_SCHEMAS and COMPILED_SCHEMAS[cache_key][0] == (schema_stat.st_mtime_ns, schema_stat.st_size):
+        return dict(COMPILED_SCHEMAS[cache_key][1]) ## Returning a copy because the columns that are not in the csv file are removed from the schema
+    compiled_schema = {}
+    for name, schema_lst in parse_schema_txt_file(txt).items():
+        if schema_lst[0] not in [i.value for i in DataType]:
+            output_message("ERROR: The '" + name + "' column in the '" + txt + "' schema .txt file has a data type of '" + schema_lst[0] + "' which is not one of Integer, Double, String, or Date.")
+            return None
+        compiled_schema[name] = ColumnSpec(name, schema_lst)
+    COMPILED_SCHEMAS[cache_key] = ((schema_stat.st_mtime_ns, schema_stat.st_size), compiled_schema)
+    return dict(compiled_schema)
+
+## schema_needs_inference takes in a list where the 0th index is a .csv file and the 1st index is its schema .txt file and returns whether the schema .txt file is missing, is empty, or does not have every column of the csv header (a csv file whose first full row matches less than half of the schema's columns is read as a csv file without a header, the same way get_columns_and_new_schema does, so its schema is not inferred)
+def schema_needs_inference(file):
+    if not os.path.exists(file[1]):
+        return True
+    schema = parse_schema_txt_file(file[1])
+    if len(schema) == 0:
+        return True
+    region = detect_data_region(file[0])
+    if region is None:
+        return False
+    columns_schema_match = len([i for i in region.header if i in schema])
+    return columns_schema_match >= len(schema)/2 and columns_schema_match < len(region.header)
+
+## infer_schema takes in the .csv file name, its schema .txt file (which can be None, missing, empty, or only have some of the columns), the number of rows to sample, and the number of bytes of data up to which the csv file is read in full and writes a '<csv file> - Inferred Schema.txt' file next to the csv file in the same format as the schema .txt files; the columns in the schema .txt file keep their line as it is and the other columns of the csv header get a data type, nullability, and date standardization inferred from a sample of the rows; returns the path of the inferred schema .txt file or None
+def infer_schema(file, schema_txt=None, sample_rows=SCHEMA_SAMPLE_ROWS, full_scan_bytes=SCHEMA_FULL_SCAN_BYTES):
+    region = detect_data_region(file)
+    if region is None or any(re.match(NUMERIC_PATTERN, i) for i in region.header): ## The first full row is data, not column names
+        output_message("ERROR: The header of the '" + file + "' file was not found, so its schema cannot be inferred.")
+        return None
+    supplied_schema = parse_schema_txt_file(schema_txt) if schema_txt is not None and os.path.exists(schema_txt) else {}
+    sample, empty_columns, complete = sample_csv_rows(file, region, sample_rows, full_scan_bytes)
+    schema_lines = ['Field_Name Data_Type Nullability date_standardization']
+    for position, name in enumerate(region.header):
+        if ' ' in name: ## The schema .txt format separates the fields with spaces
+            output_message("WARNING: The '" + name + "' column in the '" + file + "' file has a space in its name, so it cannot be added to the inferred schema .txt file.")
+        elif name in supplied_schema:
+            schema_lines.append(' '.join([name] + supplied_schema[name]))
+        else:
+            schema_lines.append(' '.join([name] + infer_column_schema([i[position] for i in sample], position in empty_columns, complete)))
+    schema_lines += [' '.join([i] + supplied_schema[i]) for i in supplied_schema if i not in region.header] ## The columns of the schema .txt file that are not in the csv file are kept, and are removed with a warning when the csv file is converted
+    inferred_schema_txt = file.split('.csv')[0] + " - Inferred Schema.txt"
+    temp_path = get_temp_path(inferred_schema_txt)
+    remove_stale_temp_outputs(inferred_schema_txt)
+    with open(temp_path, 'w', newline='') as schema_file:
+        schema_file.write('\r\n'.join(schema_lines)) ## Same layout as the developer supplied schema .txt files
+    os.replace(temp_path, inferred_schema_txt)
+    output_message("WARNING: The schema of " + str(len([i for i in region.header if i not in supplied_schema])) + " columns of the '" + file + "' file was inferred from " + str(len(sample)) + " rows and written to the '" + inferred_schema_txt + "' file. Please check it before it is used for production data.")
+    return inferred_schema_txt
+
+## sample_csv_rows takes in the .csv file name, its DataRegion, the number of rows to sample, and the number of bytes of data up to which the csv file is read in full and returns the sampled rows, the positions of the columns that had an empty or 'n/a' value in a row that was read, and whether every row of the file was read
+## A small csv file is read in full with one reservoir sample; a bigger one is split into SCHEMA_SAMPLE_STRATA parts by byte offset and only the start of each part is read, keeping a reservoir sample of each part's share, so a large file is never read in full
+def sample_csv_rows(file, region, sample_rows, full_scan_bytes=SCHEMA_FULL_SCAN_BYTES):
+    data_size = region.data_end - region.header_end
+    complete = data_size <= full_scan_bytes
+    if complete:
+        parts = [(region.header_end, region.data_end, sample_rows, None)]
+    else:
+        share = max(sample_rows // SCHEMA_SAMPLE_STRATA, 1)
+        part_size = data_size // SCHEMA_SAMPLE_STRATA
+        parts = [(region.header_end + i*part_size, region.header_end + (i+1)*part_size, share, share * SCHEMA_SAMPLE_SCAN_FACTOR) for i in range(SCHEMA_SAMPLE_STRATA)]
+    rng = random.Random(0) ## The same file always gets the same sample, so the inferred schema .txt file does not change between runs
+    sample = []
+    empty_columns = set()
+    with open(file, 'rb') as binary_file:
+        for start, end, share, scan_rows in parts:
+            binary_file.seek(start)
+            if start != region.header_end: ## The part starts in the middle of a row
+                start += len(binary_file.readline())
+            reservoir = []
+            rows_read = 0
+            try:
+                for row in csv.reader(read_lines_until(binary_file, start, end)):
+                    if len(row) != region.width or len(row) - row.count('') <= 1 or row == region.header: ## Junk rows, headers, and rows cut by the start of the part are not sampled
+                        continue
+                    empty_columns.update(position for position, value in enumerate(row) if value == '' or value.lower() == 'n/a')
+                    rows_read += 1
+                    if len(reservoir) < share:
+                        reservoir.append(row)
+                    else:
+                        replaced = rng.randrange(rows_read) ## Every row read so far has the same chance of being in the reservoir
+                        if replaced < share:
+                            reservoir[replaced] = row
+                    if scan_rows is not None and rows_read >= scan_rows:
+                        break
+            except (UnicodeDecodeError, csv.Error): ## A part that starts inside a quoted value can be read wrong; the rows read before the error are kept
+                pass
+            sample += reservoir
+    return sample, empty_columns, complete
+
+## infer_column_schema takes in the sampled raw values of a column, whether the column had an empty or 'n/a' value, and whether every row of the file was read and returns the list for the column in the schema .txt format (data type, nullability, and date standardization for Date columns)
+## A column is an Integer if every value is a whole number, a Double if every value is numerical, a Date if every value follows one of the DATE_FORMATS (standardization is only off if they are all 'YYYY-MM-DD'), and a String otherwise (also when every sampled value is empty); the numbers are checked first, so 8-digit numbers are not taken for YYYYMMDD dates; a column can only have no null values if every row of the file was read
+def infer_column_schema(values, has_empty_values, complete):
+    values = set(i for i in values if i != '')
+    nullable = 'true' if has_empty_values or not complete else 'false'
+    if len(values) == 0:
+        return ['String', 'true']
+    if all(re.match(NUMERIC_PATTERN, i) for i in values): ## Checked before the dates, so a column of 8-digit numbers (which can look like YYYYMMDD dates) is a number column
+        return ['Double' if any(float(i) % 1 != 0 for i in values) else 'Integer', nullable] ## Whole numbers with a decimal (e.g. 10000.0) are converted to Integers with a warning
+    date_formats = set(get_date_format(i) for i in values)
+    if None not in date_formats and not any(i.lower() == 'n/a' for i in values):
+        return ['Date', nullable, 'false' if date_formats == {'YYYY-MM-DD'} else 'true']
+    return ['String', nullable]
+
+## get_date_format takes in a raw value and returns the first date format from DATE_FORMATS that the value is a valid date in, or None
+def get_date_format(value):
+    for date_format in DATE_FORMATS:
+        if parse_date_with_format(value, date_format) is not None:
+            return date_format
+    return None
+
+## get_column_names_new_schema_original_file_content takes in the .csv file, the schema dictionary, the reader, and the ConversionSession and returns the Column Names, New Schema, and the raw Arrow table of the Original File Content without its junk rows
+def get_column_names_new_schema_original_file_content(file, schema, reader='spark', session=None):
+    if reader == 'spark':
+        return spark_csv_reader(file, schema, session or DEFAULT_SESSION)
+    projection = None
+    with record_stage('read'):
+        region = detect_data_region(file)
+        if region is not None: ## Only the rows between the header and the junk rows at the end of the file, and only the columns in the schema, are parsed
+            columns, schema, width, columns_to_keep, start_offset = get_region_columns(file, schema, region)
+            if columns is None:
+                return None, None, None
+            projection = get_projection(columns, columns_to_keep, region)
+            raw_table = read_raw_table(file, reader, width, start_offset, region.data_end, projection)
+        else: ## The header was not in the first few KB of the file, so it is looked for in every row, the way the Spark reader does
+            nested_lst = [row for chunk in read_csv_chunks(file, sys.maxsize) for row in chunk]
+            width = max([len(i) for i in nested_lst], default=0)
+            nested_lst = normalize_rows(nested_lst, width)
+            columns, schema = get_columns_and_new_schema(file, schema, nested_lst)
+            if columns is None and schema is None:
+                return None, None, None
+            raw_table = rows_to_table(nested_lst, width)
+            del nested_lst[:]
+    with record_stage('raw_data'):
+        if projection is not None:
+            try: ## The columns that were only parsed to find the empty rows are removed
+                return columns, schema, filter_projected_table(raw_table, columns, projection).select(columns_to_keep)
+            except UnclassifiedRowsError: ## The file is read again with every column parsed
+                raw_table = None
+    if raw_table is None:
+        with record_stage('read'):
+            raw_table = read_raw_table(file, reader, width, start_offset, region.data_end)
+    with record_stage('raw_data'):
+        raw_table = filter_raw_table(raw_table, columns)
+    return columns, schema, raw_table
+
+## spark_csv_reader takes in the .csv file, the schema dictionary, and the ConversionSession, reads the file with Spark, and returns the Column Names, New Schema, and the raw Arrow table of the Original File Content without its junk rows
+def spark_csv_reader(file, schema, session):
+    with record_stage('startup'):
+        spark = session.get_spark() ## Incorporating PySpark to read in .csv files to account for massive data inputs
+    with record_stage('read'):
+        spark_file = spark.read.csv(file) 
+        region = detect_data_region(file)
+    if region is not None: ## The header is found from the first few KB of the file, so the junk rows are removed and only the columns in the schema are selected by Spark before the rows are collected to the driver
+        columns, schema, width, columns_to_keep, start_offset = get_region_columns(file, schema, region)
+        if columns is None:
+            return None, None, None
+        raw_columns = spark_file.columns
+        with record_stage('collect'):
+            rows = get_spark_data_rows(spark_file, raw_columns, columns).select([raw_columns[columns.index(i)] for i in columns_to_keep]).collect()
+        with record_stage('raw_data'):
+            raw_data = rows_to_table([['' if v is None else v for v in i] for i in rows], len(columns_to_keep)).rename_columns(columns_to_keep)
+        return columns, schema, raw_data
     spark_file_rdd = spark_file.rdd ## Converting Spark file to RDD because there could be lines with empty data or lines that are not relevant to the data
     nested_lst = []
-    for i in spark_file_rdd.collect(): ## Converting  RDD to a list object and reading in data like this
-        i = list(i)
-        new_i = ['' if v is None else v for v in i]
-        nested_lst.append(new_i)  
-        
+    with record_stage('collect'):
+        for i in spark_file_rdd.collect(): ## Converting  RDD to a list object and reading in data like this
+            i = list(i)
+            new_i = ['' if v is None else v for v in i]
+            nested_lst.append(new_i)  
+    columns, schema = get_columns_and_new_schema(file, schema, nested_lst)
+    if columns is None and schema is None:
+        return None, None, None
+    with record_stage('raw_data'):
+        raw_data = get_raw_data(nested_lst, columns)
+        del nested_lst[:] ## The Python strings of the raw rows are not needed once they are in the Arrow table
+    return columns, schema, raw_data
+
+## get_columns_and_new_schema takes in the .csv file name, the schema dictionary, and the nested list for the raw data (or the first chunk of it) and returns the Column Names and New Schema, or None, None if the csv file cannot be processed
+def get_columns_and_new_schema(file, schema, nested_lst):
     columns = []
     for i in nested_lst:
         if i.count('') == 0: ## If every column has a value in it, the first row where this takes place will be the headers (column names)
@@ -120,11 +1700,11 @@ def get_column_names_new_schema_original_file_content(file, schema):
     if columns_schema_match < len(schema)/2: ## If csv file provided does not have a header
         columns = list(schema.keys())
         output_message("WARNING: The '" + file + "' file did not have a header provided. The columns of the data for the '" + file + "' file will be inferred from the schema .txt file of the '" + file + "' file provided.")
-        if len(nested_lst[0]) != len(list(schema.keys())): ## Number of columns in the .csv file does not match the number of columns in the schema .txt file; csv file cannot be processed
+        if len(nested_lst) == 0 or len(nested_lst[0]) != len(list(schema.keys())): ## Number of columns in the .csv file does not match the number of columns in the schema .txt file; csv file cannot be processed
             output_message("ERROR: Since the '" + file + "' file did not have a header provided and since the number of columns from the schema .txt file provided does not match the number of columns in the csv data provided, the '" + file + "' file cannot be processed.")
-            return None, None, None
+            return None, None
         else:
-            return columns, schema, nested_lst
+            return columns, schema
     ## Checking if there are more columns in the schema provided than in the csv file provided        
     schema_columns_not_in_data = []
     for i in schema:
@@ -133,30 +1713,70 @@ def get_column_names_new_schema_original_file_content(file, schema):
     for i in schema_columns_not_in_data:
         output_message("WARNING: The '" + i + "' column in the schema .txt file of the '" + file + "' file is not in the csv data provided. The '" + i + "' column will not be in the '" + file + "' parquet file.")
         del schema[i] ## removing those columns from the schema
-    return columns, schema, nested_lst
+    return columns, schema
 
-## get_raw_data takes in the nested list represented by the raw data and the column names and returns a DataFrame for the raw data
+## get_raw_data takes in the nested list represented by the raw data and the column names and returns an Arrow table of string columns for the raw data
 def get_raw_data(lst, columns):
-    raw_lst = []
-    for i in lst:
-        if i.count('') >= len(lst[0])-1: ## Remove rows that are empty or only have one column filled
-            continue
-        if i == columns:
-            continue
-        raw_lst.append(i)
-    raw_data = pd.DataFrame(raw_lst, columns=columns)
-    return raw_data
+    return filter_raw_table(rows_to_table(lst, len(lst[0]) if len(lst) > 0 else len(columns)), columns)
+
+## rows_to_table takes in a nested list where every row has width values and the positions of the columns to keep (None for every column) and returns a raw Arrow table of string columns named by their position
+def rows_to_table(rows, width, columns=None):
+    cells = np.empty((len(rows), width), dtype=object)
+    if len(rows) > 0:
+        cells[:] = rows
+    columns = range(width) if columns is None else columns
+    return pa.Table.from_arrays([pa.array(cells[:, i], type=pa.string()) for i in columns], names=[str(i) for i in columns]) ## Every column is an Arrow string array instead of a column of Python strings
+
+## filter_raw_table takes in a raw Arrow table and the column names and returns the table without the rows that are empty, only have one column filled, or are the header, with the column names
+def filter_raw_table(table, columns):
+    empty_values = np.zeros(table.num_rows, dtype=np.int64)
+    for i in table.columns: ## The rows are checked one column at a time instead of one row at a time
+        empty_values += pc.fill_null(pc.equal(i, ''), True).to_numpy()
+    keep = empty_values < table.num_columns-1 ## Remove rows that are empty or only have one column filled
+    if len(columns) == table.num_columns and table.num_rows > 0:
+        possible_headers = np.flatnonzero(keep & pc.fill_null(pc.equal(table.column(0), columns[0]), False).to_numpy()) ## Only the rows that start with the first column name are compared to the whole header
+        header_rows = zip(*[i.to_pylist() for i in table.take(possible_headers).columns])
+        keep[possible_headers[[list(i) == columns for i in header_rows]]] = False ## Remove rows that are the header
+    return table.filter(pa.array(keep)).rename_columns(columns)
+
+## get_projection takes in the Column Names, the columns that are in the schema, and the DataRegion of the csv file and returns the positions of the columns the readers parse, or None if every column is parsed; the header is resolved first, so only the columns in the schema are parsed, plus the first columns that are filled in every data row at the start of the file until at least two of those columns are parsed, so the data rows usually have two parsed values and are told apart from the rows that are empty or only have one column filled without parsing the other columns (a row that does not is read again with every column, see filter_projected_table); if fewer than two columns are filled in every one of those rows, every column is parsed
+def get_projection(columns, columns_to_keep, region):
+    if len(columns_to_keep) == region.width:
+        return None
+    positions = [columns.index(i) for i in columns_to_keep]
+    rows = [row for row in region.prefix_rows if len(row) - row.count('') > 1 and row != region.header] ## The junk rows before the header only have one column filled
+    anchors = [i for i in range(region.width) if len(rows) > 0 and all(row[i] != '' for row in rows)]
+    if len(anchors) < 2: ## The rows that only have one column filled could not be told apart from the data rows
+        return None
+    for i in anchors:
+        if len([j for j in positions if j in anchors]) >= 2:
+            break
+        if i not in positions:
+            positions.append(i)
+    return sorted(positions)
+
+## filter_projected_table takes in a raw Arrow table of the projected columns of a csv file (see get_projection), the Column Names, and the positions of the projected columns and returns the table without the rows that are the header, with the column names; a row with at least two projected columns filled is a data row (the same rule as filter_raw_table), and UnclassifiedRowsError is raised for any other row, since whether it is a data row depends on the columns that were not parsed (unless the reader already removed the rows that are empty or only have one column filled, see read_python_tables)
+def filter_projected_table(table, columns, projection):
+    filled = np.zeros(table.num_rows, dtype=np.int64)
+    is_header = np.ones(table.num_rows, dtype=bool)
+    for position, i in zip(projection, table.columns): ## The rows are checked one column at a time instead of one row at a time
+        filled += pc.fill_null(pc.not_equal(i, ''), False).to_numpy(zero_copy_only=False)
+        is_header &= pc.fill_null(pc.equal(i, columns[position]), False).to_numpy(zero_copy_only=False)
+    classified = table.schema.metadata is not None and table.schema.metadata.get(b'csv_to_parquet.classified_rows') == b'true'
+    if not classified and np.any(filled < 2):
+        raise UnclassifiedRowsError(int(np.flatnonzero(filled < 2)[0]))
+    return table.filter(pa.array(~is_header)).replace_schema_metadata(None).rename_columns([columns[i] for i in projection])
 
-## check_if_columns_in_csv_not_in_schema takes in the raw DataFrame, the csv file name, and the schema dictionary and removes the columns from the DataFrame if they are not provided in the schema and returns this new DataFrame
+## check_if_columns_in_csv_not_in_schema takes in the raw Arrow table, the csv file name, and the schema dictionary and removes the columns from the table if they are not provided in the schema and returns this new table
 def check_if_columns_in_csv_not_in_schema(df, file, schema):
     columns_to_drop = []
-    for i in df.columns:
+    for i in df.column_names:
         if i not in schema:
             columns_to_drop.append(i)
             output_message("WARNING: The '" + i + "' column in the '" + file + "' file is not in the schema .txt file provided. The '" + i + "' column will not be in the '" + file + "' parquet file.")
     if len(columns_to_drop) == 0:
         return df
-    df = df.drop(columns = columns_to_drop)
+    df = df.drop_columns(columns_to_drop)
     return df
 
 ## get_column_values takes in the .csv file name, the row value, the name of the column, and list from the schema dictionary that represents the column
@@ -172,7 +1792,7 @@ def get_column_values(file, value, col, schema_lst): ## Get Column Values
         return float(value)
     elif schema_lst[0] == 'Integer':
         if '.' in value: ## If an Integer value is numerical but has a decimal in it - convert decimal to int
-            output_message("WARNING: The '" + col + "' column in the '" + file + "' file has a value of " + str(value) + " and the schema .txt file says the '" + col + "' column is an Integer. It will be converted to " + str(int(float(value))) + '.')
+            output_value_warning(file, col, 1, [value + ' -> ' + str(int(float(value)))], None, "with a decimal", " and the schema .txt file says the '" + col + "' column is an Integer. They will be converted to Integers.")
             return int(float(value))
         else:
             return int(value)
@@ -182,14 +1802,14 @@ def get_column_values(file, value, col, schema_lst): ## Get Column Values
         return value
     elif schema_lst[0] == 'Date' and schema_lst[2] == 'false': ## if schema says a Date column and doesn't need standardization, then return value as is after it is parsed
         try:
-            return parse(value).date() ## parse value as date and return
+            return dateutil_parser.parse(value).date() ## parse value as date and return
         except ValueError:
             return str(value) + 'Invalid Conversion' ## if it cannot be parsed as a date
     elif schema_lst[0] == 'Date' and schema_lst[2] == 'true': ## if schema says a Date column and DOES need standardization, apply the below rules based on how the data is formatted in the column
         if len(value.split('-')) > 1:
             if len(value.split('-')) == 3: ## if the splitted string forms a list with 3 values in it
                 try:
-                    return parse(value).date() ## parse value as date and return
+                    return dateutil_parser.parse(value).date() ## parse value as date and return
                 except ValueError:
                     return str(value) + '-Invalid Conversion' ## if it cannot be parsed as a date
             elif len(value.split('-')) == 2: ## if the splitted string forms a list with 2 values in it
@@ -206,12 +1826,12 @@ def get_column_values(file, value, col, schema_lst): ## Get Column Values
                     else:
                         year = int(value.split('-')[0]) + 1900
                 try:
-                    return parse(str(year) + '-' + str(month) + '-' + '01').date() ## parse standardized value as date and return
+                    return dateutil_parser.parse(str(year) + '-' + str(month) + '-' + '01').date() ## parse standardized value as date and return
                 except ValueError:
                     return str(value) + '-Invalid Conversion' ## if standardized value cannot be parsed as date
         elif len(value.split('/')) == 3: ## if the splitted string forms a list with 3 values in it
             try:
-                return parse(value).date() ## parse value as date and return
+                return dateutil_parser.parse(value).date() ## parse value as date and return
             except ValueError:
                 return str(value) + '-Invalid Conversion' ## if it cannot be parsed as a date
         else: ## if there is no "-" or "/"
@@ -225,12 +1845,12 @@ def get_column_values(file, value, col, schema_lst): ## Get Column Values
                 year = year
             elif len(str(year)) == 8: ## if the number of digits is 8, this will indicate the entire date
                 try:
-                    return parse(str(year)).date() ## parse value as date and return
+                    return dateutil_parser.parse(str(year)).date() ## parse value as date and return
                 except ValueError:
                     return str(value) + '-Invalid Conversion' ## if it cannot be parsed as a date
             else:
                 try:
-                    return parse(str(year)[:4] + '-' + str(year)[4:6] + '-' + '01').date() ## parse standardized value as date and return
+                    return dateutil_parser.parse(str(year)[:4] + '-' + str(year)[4:6] + '-' + '01').date() ## parse standardized value as date and return
                 except ValueError:
                     return str(value) + '-Invalid Conversion' ## if standardized value cannot be parsed as a date
             month = "".join(re.split("[^a-zA-Z]*", value)).strip() ## getting the alphabetic values which indicates the month
@@ -242,7 +1862,7 @@ def get_column_values(file, value, col, schema_lst): ## Get Column Values
                     break
             if flag:
                 try:
-                    return parse(str(year) + '-' + str(month) + '-01').date() ## parse standardized value as date and return
+                    return dateutil_parser.parse(str(year) + '-' + str(month) + '-01').date() ## parse standardized value as date and return
                 except ValueError:
                     return str(value) + '-Invalid Conversion' ## if standardized value cannot be parsed as a date
             for j in calendar.month_name: ## checking if alphabetic values is a month name
@@ -250,11 +1870,313 @@ def get_column_values(file, value, col, schema_lst): ## Get Column Values
                     month = list(calendar.month_name).index(j) ## month number
                     break
             try:
-                return parse(str(year) + '-' + str(month) + '-01').date() ## parse standardized value as date and return
+                return dateutil_parser.parse(str(year) + '-' + str(month) + '-01').date() ## parse standardized value as date and return
             except ValueError:
                 return str(value) + '-Invalid Conversion' ## if standardized value cannot be parsed as a date
 
-## output_message gets called when a message needs to be displayed; For this project, messages will be outputted to console. In actual production, messages can be sent out via email, slack, etc.
+ACTIVE_FILE_METRICS = None ## The FileMetrics of the file this process is working on; the pipeline functions record their stage times into it
+
+## FileMetrics has the metrics of one (csv, schema) pair: the wall time of each stage and of the whole file, the conversion time of each column, the rows and bytes in and out, the change in memory (RSS) of the process while the file was processed, and the peak memory (RSS) of the process
+class FileMetrics:
+    def __init__(self, csv_file, schema_file):
+        self.csv_file = csv_file
+        self.schema_file = schema_file
+        self.succeeded = False
+        self.wall_seconds = 0.0
+        self.stage_seconds = {} ## The keys will be the stage names ('read', 'collect', 'raw_data', 'filter', 'convert', 'checks', 'write'); the values will be the seconds spent in the stage
+        self.column_seconds = {} ## The keys will be the column names; the values will be the seconds spent converting the column
+        self.rows_in = 0 ## Data rows read from the csv file after the empty rows and headers are removed
+        self.rows_out = 0 ## Rows written to the .parquet file
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.rss_increase_bytes = None ## Memory (RSS) of the process after the file minus before it; the memory that was freed before the file was done is not counted
+        self.peak_rss_bytes = None ## Peak memory (RSS) of the process since it started, not of the file: files processed earlier by the same process (or by the caller before the batch) can have set it
+        self.attempts = 0 ## Number of times the file was processed (more than 1 after transient failures)
+        self.error = None ## The first error message of the file, or the exception that stopped it
+        self.outputs = [] ## Paths of the outputs written for the file
+
+    def to_dict(self):
+        return dict(vars(self))
+
+## PipelineMetrics collects the FileMetrics of every file in a batch; if sink is the name of a file, the metrics of each file are also appended to it as one JSON line
+class PipelineMetrics:
+    def __init__(self, sink=None):
+        self.files = []
+        self.sink = sink
+
+    def add(self, file_metrics):
+        self.files.append(file_metrics)
+        if self.sink is not None:
+            with open(self.sink, 'a') as sink_file:
+                sink_file.write(json.dumps(file_metrics.to_dict()) + "\n")
+
+    def stage_seconds(self): ## Returns the seconds spent in each stage across all the files
+        totals = {}
+        for i in self.files:
+            for stage, seconds in i.stage_seconds.items():
+                totals[stage] = totals.get(stage, 0) + seconds
+        return totals
+
+## record_stage is a context manager that adds the time spent inside it to a stage (and to a column, if one is given) of the FileMetrics of the file being processed
+@contextmanager
+def record_stage(stage, column=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if ACTIVE_FILE_METRICS is not None:
+            seconds = time.perf_counter() - start
+            ACTIVE_FILE_METRICS.stage_seconds[stage] = ACTIVE_FILE_METRICS.stage_seconds.get(stage, 0) + seconds
+            if column is not None:
+                ACTIVE_FILE_METRICS.column_seconds[column] = ACTIVE_FILE_METRICS.column_seconds.get(column, 0) + seconds
+
+## record_chunks takes in a generator of chunks and yields the same chunks, adding the time spent reading each chunk to the 'read' stage
+def record_chunks(chunks):
+    chunks = iter(chunks)
+    while True:
+        with record_stage('read'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+## record_rows takes in the number of rows read and written and adds them to the FileMetrics of the file being processed
+def record_rows(rows_in=0, rows_out=0):
+    if ACTIVE_FILE_METRICS is not None:
+        ACTIVE_FILE_METRICS.rows_in += rows_in
+        ACTIVE_FILE_METRICS.rows_out += rows_out
+
+## get_recorded_rows returns the rows in and out recorded so far for the file being processed, or None if no file is being processed
+def get_recorded_rows():
+    if ACTIVE_FILE_METRICS is None:
+        return None
+    return ACTIVE_FILE_METRICS.rows_in, ACTIVE_FILE_METRICS.rows_out
+
+## reset_recorded_rows takes in the rows in and out returned by get_recorded_rows and sets the FileMetrics of the file being processed back to them
+def reset_recorded_rows(recorded_rows):
+    if ACTIVE_FILE_METRICS is not None and recorded_rows is not None:
+        ACTIVE_FILE_METRICS.rows_in, ACTIVE_FILE_METRICS.rows_out = recorded_rows
+
+## get_peak_rss_bytes returns the peak memory (RSS) of this process in bytes, or None if it cannot be found on this platform
+def get_peak_rss_bytes():
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024 ## ru_maxrss is in bytes on macOS and in kilobytes on Linux
+
+## get_current_rss_bytes returns the memory (RSS) this process is using now in bytes, or None if it cannot be found on this platform
+def get_current_rss_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') ## The second value is the number of resident pages
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+## get_path_size takes in the path of a file or folder and returns its size in bytes (0 if it does not exist)
+def get_path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, i)) for root, folders, files in os.walk(path) for i in files)
+
+## output_message gets called when a message needs to be displayed; the message is handed to the Diagnostics of the batch, which writes it to its destinations (the console by default, or files, JSON logs, and webhooks) on a background thread, so this never waits for I/O
 def output_message(message): 
-    print(message)
-    print()
\ No newline at end of file
+    if ACTIVE_FILE_METRICS is not None and ACTIVE_FILE_METRICS.error is None and message.startswith('ERROR: '): ## The first error is the reason the file failed
+        ACTIVE_FILE_METRICS.error = message[len('ERROR: '):]
+    ACTIVE_DIAGNOSTICS.emit(message)
+
+## output_value_warning takes in the .csv file name, the column name, the number of values, a few example values, the data row of the first value (None if it is not known), what the values have, and the rest of the warning and adds them to the aggregated warning of the column, which is sent once the file is done
+def output_value_warning(file, column, count, values, first_row, description, explanation):
+    ACTIVE_DIAGNOSTICS.add_value_warning(file, column, count, values, first_row, description, explanation)
+
+## Severity has the severity levels of the messages
+class Severity(Enum):
+    INFO = 1
+    WARNING = 2
+    ERROR = 3
+
+## get_message_severity takes in a message and returns its Severity from its 'ERROR: ' or 'WARNING: ' prefix
+def get_message_severity(message):
+    if message.startswith('ERROR: '):
+        return Severity.ERROR
+    if message.startswith('WARNING: '):
+        return Severity.WARNING
+    return Severity.INFO
+
+## Diagnostics sends messages to its destinations from a background thread: emit only puts the message on a bounded queue (a full queue drops the message and counts it), at most max_messages_per_second are written when it is not None (errors are always written), and messages below min_severity are ignored
+## Warnings about single values (e.g. Integer values with a decimal) are aggregated per file and column into one warning with the number of values, a few example values, and the row of the first one, which is sent by flush_file when the file is done
+## A destination is any object with write(record), flush(), and close() methods; a record is a dictionary with the time, severity, and message (and the file, column, count, first row, and example values of aggregated warnings)
+class Diagnostics:
+    def __init__(self, destinations=None, max_messages_per_second=DIAGNOSTICS_MAX_MESSAGES_PER_SECOND, min_severity=Severity.INFO, queue_size=DIAGNOSTICS_QUEUE_SIZE):
+        self.destinations = destinations if destinations is not None else [ConsoleDestination()]
+        self.max_messages_per_second = max_messages_per_second
+        self.min_severity = min_severity
+        self.queue_size = queue_size
+        self.value_warnings = {} ## The keys will be the file, column, and description of the aggregated warnings; the values will be the aggregated warning
+        self.dropped_messages = 0 ## Messages dropped because the queue was full
+        self.rate_limited_messages = 0 ## Messages not written because of the rate limit
+        self.lock = threading.Lock()
+        self.pid = None ## The background thread is started by the first message of each process
+
+    def start(self):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(self.queue_size)
+        self.thread = threading.Thread(target=self.write_messages, name='csv_to_parquet-diagnostics', daemon=True)
+        self.thread.start()
+
+    def emit(self, message, severity=None, **fields):
+        severity = severity or get_message_severity(message)
+        if severity.value < self.min_severity.value:
+            return
+        if self.pid != os.getpid(): ## First message, or a worker process forked from a process that had the thread
+            self.start()
+        try:
+            self.queue.put_nowait(dict(fields, time=time.time(), severity=severity.name, message=message))
+        except queue.Full:
+            self.dropped_messages += 1
+
+    def add_value_warning(self, file, column, count, values, first_row, description, explanation):
+        with self.lock:
+            value_warning = self.value_warnings.setdefault((file, column, description), {'file': file, 'column': column, 'count': 0, 'first_row': first_row, 'sample_values': [], 'description': description, 'explanation': explanation})
+            value_warning['count'] += count
+            value_warning['sample_values'] += values[:DIAGNOSTICS_SAMPLE_VALUES - len(value_warning['sample_values'])]
+            if value_warning['first_row'] is None:
+                value_warning['first_row'] = first_row
+
+    def flush_file(self, file): ## Sends the aggregated warnings of the file
+        with self.lock:
+            value_warnings = [self.value_warnings.pop(i) for i in list(self.value_warnings) if i[0] == file]
+        for i in value_warnings:
+            where = "" if i['first_row'] is None else "the first one is in row " + str(i['first_row']) + ", "
+            message = "WARNING: The '" + i['column'] + "' column in the '" + i['file'] + "' file has " + str(i['count']) + (" value " if i['count'] == 1 else " values ") + i['description'] + " (" + where + "e.g. " + ", ".join(i['sample_values']) + ")" + i['explanation']
+            self.emit(message, Severity.WARNING, file=i['file'], column=i['column'], count=i['count'], first_row=i['first_row'], sample_values=i['sample_values'])
+
+    def flush(self): ## Sends every aggregated warning and waits until every message has been written
+        for file in set(i[0] for i in list(self.value_warnings)):
+            self.flush_file(file)
+        if self.pid != os.getpid():
+            return
+        self.queue.join()
+        if self.dropped_messages > 0 or self.rate_limited_messages > 0:
+            limit = "" if self.max_messages_per_second is None else " (at most " + str(self.max_messages_per_second) + " messages per second)"
+            self.emit("WARNING: " + str(self.dropped_messages + self.rate_limited_messages) + " messages were not written because more messages were sent than the diagnostics could keep up with" + limit + ".", Severity.WARNING, summary=True)
+            self.dropped_messages = self.rate_limited_messages = 0
+            self.queue.join()
+
+    def close(self): ## Writes every message and closes the destinations
+        self.flush()
+        if self.pid == os.getpid():
+            self.queue.put(None)
+            self.thread.join()
+            self.pid = None
+        for i in self.destinations:
+            i.close()
+
+    def write_messages(self): ## Runs on the background thread
+        tokens = self.max_messages_per_second
+        last_refill = time.monotonic()
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    return
+                if self.max_messages_per_second is not None and record['severity'] != Severity.ERROR.name and not record.get('summary'):
+                    now = time.monotonic()
+                    tokens = min(tokens + (now - last_refill) * self.max_messages_per_second, self.max_messages_per_second)
+                    last_refill = now
+                    if tokens < 1:
+                        self.rate_limited_messages += 1
+                        continue
+                    tokens -= 1
+                for i in self.destinations:
+                    try:
+                        i.write(record)
+                    except Exception: ## A destination that fails should never stop the conversion
+                        pass
+                if self.queue.empty():
+                    for i in self.destinations:
+                        try:
+                            i.flush()
+                        except Exception:
+                            pass
+            finally:
+                self.queue.task_done()
+
+    def __getstate__(self): ## A Diagnostics sent to a worker process starts its own queue and thread
+        return {i: j for i, j in self.__dict__.items() if i not in ('lock', 'queue', 'thread', 'pid')}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        self.pid = None
+
+## ConsoleDestination prints every message followed by an empty line
+class ConsoleDestination:
+    def write(self, record):
+        print(record['message'])
+        print()
+
+    def flush(self):
+        sys.stdout.flush()
+
+    def close(self):
+        self.flush()
+
+## FileDestination appends every message to a text file as one line with its time and severity
+class FileDestination:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def format(self, record):
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['time'])) + ' ' + record['severity'] + ' ' + record['message'].replace('\n', ' ')
+
+    def write(self, record):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.file.write(self.format(record) + '\n')
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __getstate__(self):
+        return dict(self.__dict__, file=None)
+
+## JsonLogDestination appends every message to a file as one JSON line with all the fields of the record
+class JsonLogDestination(FileDestination):
+    def format(self, record):
+        return json.dumps(record)
+
+## WebhookDestination posts the messages to a URL as a JSON list, one request for the messages written since the last flush; a request that fails is counted in failed_requests and the messages are not sent again
+class WebhookDestination:
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self.records = []
+        self.failed_requests = 0
+
+    def write(self, record):
+        self.records.append(record)
+
+    def flush(self):
+        if len(self.records) == 0:
+            return
+        records, self.records = self.records, []
+        request = urllib.request.Request(self.url, data=json.dumps(records).encode('utf-8'), headers={'Content-Type': 'application/json'})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except OSError:
+            self.failed_requests += 1
+
+    def close(self):
+        self.flush()
+
+DEFAULT_DIAGNOSTICS = Diagnostics() ## The Diagnostics used when csv_to_parquet is not given one; it prints the messages to the console
+ACTIVE_DIAGNOSTICS = DEFAULT_DIAGNOSTICS ## The Diagnostics of the batch this process is working on
+atexit.register(lambda: ACTIVE_DIAGNOSTICS.flush() or DEFAULT_DIAGNOSTICS.flush()) ## Messages sent outside of csv_to_parquet are still written before the process exits
\ No newline at end of file
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 ## main.py file will be used to show how the csv_to_parquet.csv_to_parquet library can be used
-from csv_to_parquet import csv_to_parquet ## The library I created is csv_to_parquet.csv_to_parquet
+from csv_to_parquet import csv_to_parquet, ConversionSession ## The library I created is csv_to_parquet.csv_to_parquet
 
 if __name__ == '__main__':
     ## Hard-coding the file names to be processed for testing purposes
@@ -25,4 +25,5 @@ if __name__ == '__main__':
 #         files_list.append([csv_file, schema_file])
 # =============================================================================
     ## the csv_to_parquet library takes in a multidimensional list where each index is another list where the 0th index is the name of the .csv file and the 1st index is a .txt file that contains the respective .csv file's developer-supplied file schema
-    lst = csv_to_parquet(files_list) 
\ No newline at end of file
+    with ConversionSession() as session: ## Spark is only started if a file needs it and is shut down once every file has been processed
+        lst = csv_to_parquet(files_list, session=session) 
\ No newline at end of file
@@ -1,12 +1,26 @@
 # -*- coding: utf-8 -*-
 ## unit_tests.py file has unit tests to test out the features of the "csv_to_parquet.csv_to_parquet" library
 import unittest
-from csv_to_parquet import csv_to_parquet, parse_schema_txt_file
+from csv_to_parquet import csv_to_parquet, parse_schema_txt_file, convert_table_column, ColumnSpec, get_column_values, get_compiled_schema, DataType, LazyParquet, PipelineMetrics, detect_data_region, get_raw_data, to_parquet, get_return_value, choose_csv_reader, ConversionSession, infer_schema, Diagnostics, FileDestination, JsonLogDestination, WebhookDestination, Severity, get_projection, read_arrow_tables
 import pandas as pd
 from pandas.api.types import is_int64_dtype, is_float_dtype, is_string_dtype, is_datetime64_dtype
 import numpy as np
 from datetime import datetime
 import os
+import errno
+import csv
+import json
+import glob
+import shutil
+import pyarrow as pa
+import pyarrow.parquet as pq
+import benchmark
+import subprocess
+import pickle
+import sys
+import threading
+import http.server
+import csv_to_parquet as csv_to_parquet_module
 
 """
 Test these use-cases:
@@ -22,6 +36,25 @@ Test these use-cases:
                   ['LoanStats_securev1_2018Q4 - Nullability.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema.txt']
                   ]
 """
+## write_sample_with_violations writes a copy of the sample csv file with values that cannot be converted to an Integer in data rows 3 and 20 and a null value in a column that cannot have null values in data row 3
+def write_sample_with_violations():
+    rows = list(csv.reader(open('LoanStats_securev1_2018Q4 - Sample.csv', newline='')))
+    rows[4][2] = '5,000' ## loan_amnt of data row 3
+    rows[4][9] = '' ## loan_status of data row 3
+    rows[23][2] = 'ten thousand' ## loan_amnt of data row 20
+    with open('LoanStats_securev1_2018Q4 - Sample Violations.csv', 'w', newline='') as csv_file:
+        csv.writer(csv_file, quoting=csv.QUOTE_ALL).writerows(rows)
+
+## convert_test_column converts the raw values as the 'test_column' column of a table with convert_table_column in 'report' mode and returns the converted values as a list and the violations
+def convert_test_column(raw_values, schema_lst):
+    violations = []
+    values, has_violations = convert_table_column('test.csv', pa.table({'test_column': pa.array(raw_values, pa.string())}), 'test_column', ColumnSpec('test_column', schema_lst), 'report', violations, 0)
+    return values.to_pylist(), violations
+
+def remove_sample_parquet():
+    if os.path.exists("../output_files/LoanStats_securev1_2018Q4 - Sample.parquet"):
+        os.remove("../output_files/LoanStats_securev1_2018Q4 - Sample.parquet")
+
 class Test_csv_to_parquet(unittest.TestCase):
     
     def test_success_dataframe_returned_schema_has_more_columns(self): ## Test to see that a DataFrame is returned even if the schema .txt file has more columns than the csv data
@@ -187,7 +220,576 @@ class Test_csv_to_parquet(unittest.TestCase):
                 self.assertTrue(is_string_dtype(result[i]))
             elif schema_dictionary[i] == 'Date':
                 self.assertTrue(is_datetime64_dtype(result[i]))
-            
+    
+    def test_success_parquet_created_streaming(self): ## Test to see that a Parquet table is created and its path is returned when the csv file is read in chunks
+        remove_sample_parquet()
+        print("In the test_success_parquet_created_streaming test case")
+        try:
+            result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True, chunk_size=5)
+            self.assertEqual(result[0], "../output_files/LoanStats_securev1_2018Q4 - Sample.parquet")
+            self.assertTrue('LoanStats_securev1_2018Q4 - Sample.parquet' in os.listdir("../output_files"))
+        finally:
+            remove_sample_parquet()
+        
+    def test_success_streaming_chunk_size_does_not_change_data(self): ## Test to see that the Parquet table created in streaming mode has the same data no matter how many rows are in each chunk
+        print("In the test_success_streaming_chunk_size_does_not_change_data test case")
+        try:
+            small_chunks = pd.read_parquet(csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True, chunk_size=3)[0])
+            one_chunk = pd.read_parquet(csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True)[0])
+        finally:
+            remove_sample_parquet()
+        self.assertEqual(len(one_chunk), 24)
+        self.assertTrue(small_chunks.equals(one_chunk))
+        
+    def test_success_convert_column_matches_get_column_values(self): ## Test to see that converting a whole column at once gives the same values as converting it one value at a time
+        print("In the test_success_convert_column_matches_get_column_values test case")
+        raw_values = ['12', '+7', '-3', '007', '', '10000.0', '2.75', '-.5', '35000']
+        for data_type in ['Integer', 'Double']:
+            converted, violations = convert_test_column(raw_values, [data_type, 'true'])
+            expected = [get_column_values('test.csv', v, 'test_column', [data_type, 'true']) for v in raw_values]
+            self.assertEqual(len(violations), 0)
+            self.assertEqual(converted, expected)
+        raw_strings = ['A', 'n/a', 'N/A', '', ' 36 months']
+        converted, violations = convert_test_column(raw_strings, ['String', 'true'])
+        self.assertEqual(converted, [get_column_values('test.csv', v, 'test_column', ['String', 'true']) for v in raw_strings])
+        
+    def test_error_convert_column_reports_first_invalid_value(self): ## Test to see that the first value that cannot be converted to a number is reported
+        print("In the test_error_convert_column_reports_first_invalid_value test case")
+        converted, violations = convert_test_column(['12', '', '1O', 'abc'], ['Integer', 'true'])
+        self.assertEqual(violations[0]['value'], '1O')
+        self.assertEqual([i['row'] for i in violations], [3, 4])
+        self.assertEqual(converted, [12, None, None, None])
+        
+    def test_success_convert_column_standardizes_dates_like_get_column_values(self): ## Test to see that Date columns with mixed formats are standardized the same way as get_column_values standardizes them one value at a time
+        print("In the test_success_convert_column_standardizes_dates_like_get_column_values test case")
+        raw_values = ['Dec-18', 'Jan-99', 'Dec-18', '18-Nov', '2018-12-05', '12/05/2018', '13/05/2018', '20181205', 'Dec2018', '', 'Feb-19']
+        for date_standardization in ['true', 'false']:
+            converted, violations = convert_test_column(raw_values, ['Date', 'true', date_standardization])
+            expected = [get_column_values('test.csv', v, 'test_column', ['Date', 'true', date_standardization]) for v in raw_values]
+            self.assertEqual(len(violations), 0)
+            self.assertEqual([None if v is None else v.date() for v in converted], expected)
+        converted, violations = convert_test_column(['2018-12-05', '2018-02-30', '2018-13-01'], ['Date', 'true', 'true'])
+        self.assertEqual(violations[0]['value'], '2018-02-30')
+        self.assertEqual(violations[0]['violation'], 'cannot be converted to Date')
+        
+    def test_success_parallel_results_in_files_list_order(self): ## Test to see that files processed by worker processes are returned in the same order as the files list with None for the files that could not be processed
+        print("In the test_success_parallel_results_in_files_list_order test case")
+        try:
+            result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt'],
+                                     ['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Empty Schema.txt'],
+                                     ['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Three Columns.txt']], streaming=True, workers=2, memory_budget_gb=1)
+        finally:
+            remove_sample_parquet()
+        self.assertEqual(result, ["../output_files/LoanStats_securev1_2018Q4 - Sample.parquet", None, "../output_files/LoanStats_securev1_2018Q4 - Sample.parquet"])
+        
+    def test_error_parquet_not_created_validation_fail_fast(self): ## Test to see that None is returned and a Parquet table is not created when a value cannot be converted and the validation mode stops at the first violation
+        print("In the test_error_parquet_not_created_validation_fail_fast test case")
+        write_sample_with_violations()
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Violations.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True, chunk_size=4, validation='fail_fast')
+        os.remove('LoanStats_securev1_2018Q4 - Sample Violations.csv')
+        self.assertEqual(result[0], None)
+        self.assertFalse('LoanStats_securev1_2018Q4 - Sample Violations.parquet' in os.listdir("../output_files"))
+        self.assertFalse('LoanStats_securev1_2018Q4 - Sample Violations - Validation Report.csv' in os.listdir("../output_files"))
+        
+    def test_error_validation_report_lists_every_violation(self): ## Test to see that every value that is not aligned with the schema is written to the validation report with its row number
+        print("In the test_error_validation_report_lists_every_violation test case")
+        write_sample_with_violations()
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Violations.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True, chunk_size=4, validation='report')
+        os.remove('LoanStats_securev1_2018Q4 - Sample Violations.csv')
+        self.assertEqual(result[0], None)
+        report = pd.read_csv("../output_files/LoanStats_securev1_2018Q4 - Sample Violations - Validation Report.csv", dtype=str)
+        os.remove("../output_files/LoanStats_securev1_2018Q4 - Sample Violations - Validation Report.csv")
+        self.assertEqual(report[['column', 'row']].values.tolist(), [['loan_amnt', '3'], ['loan_status', '3'], ['loan_amnt', '20']])
+        
+    def test_success_compiled_schema_is_cached_until_schema_changes(self): ## Test to see that a schema .txt file is only compiled again when it changes
+        print("In the test_success_compiled_schema_is_cached_until_schema_changes test case")
+        open('Compiled Schema Test.txt', 'w').write("Field_Name Data_Type Nullability date_standardization\nid Integer true\nissue_d Date false true")
+        first = get_compiled_schema('Compiled Schema Test.txt')
+        second = get_compiled_schema('Compiled Schema Test.txt')
+        self.assertTrue(first['id'] is second['id'])
+        self.assertEqual(first['issue_d'].data_type, DataType.DATE)
+        self.assertFalse(first['issue_d'].nullable)
+        self.assertTrue(first['issue_d'].date_standardization)
+        open('Compiled Schema Test.txt', 'w').write("Field_Name Data_Type Nullability date_standardization\nid Double false")
+        os.utime('Compiled Schema Test.txt', ns=(0, 1))
+        third = get_compiled_schema('Compiled Schema Test.txt')
+        os.remove('Compiled Schema Test.txt')
+        self.assertEqual(list(third.keys()), ['id'])
+        self.assertEqual(third['id'].data_type, DataType.DOUBLE)
+        
+    def test_success_incremental_skips_unchanged_and_appends_new_rows(self): ## Test to see that an unchanged csv file is not processed again that only the rows appended to a csv file are processed (and reported with their row number in the whole file), and that the manifest is written through a temporary path of this process
+        print("In the test_success_incremental_skips_unchanged_and_appends_new_rows test case")
+        sample = open('LoanStats_securev1_2018Q4 - Sample.csv').read()
+        open('LoanStats_securev1_2018Q4 - Sample Incremental.csv', 'w').write(sample)
+        files_list = [['LoanStats_securev1_2018Q4 - Sample Incremental.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']]
+        open("../output_files/LoanStats_securev1_2018Q4 - Sample Incremental - Manifest.json.999999999.tmp", 'w').write('{') ## Left behind by a process that was killed while writing the manifest
+        first = csv_to_parquet(files_list, streaming=True, incremental=True)[0]
+        temp_files = glob.glob("../output_files/LoanStats_securev1_2018Q4 - Sample Incremental - Manifest.json*.tmp")
+        second = csv_to_parquet(files_list, streaming=True, incremental=True)[0]
+        with open('LoanStats_securev1_2018Q4 - Sample Incremental.csv', 'a') as csv_file:
+            csv_file.write('"144999999","","20000"," 36 months"," 7.21%","619.47","A","Pilot","Dec-18","Current","WA","Mar-01",""\n')
+        third = csv_to_parquet(files_list, streaming=True, incremental=True)[0]
+        output_files = list(third.paths)
+        with open('LoanStats_securev1_2018Q4 - Sample Incremental.csv', 'a') as csv_file:
+            csv_file.write('"145000000","","twenty"," 36 months"," 7.21%","619.47","A","Pilot","Dec-18","Current","WA","Mar-01",""\n')
+        fourth = csv_to_parquet(files_list, streaming=True, incremental=True, validation='report')[0]
+        with open("../output_files/LoanStats_securev1_2018Q4 - Sample Incremental - Validation Report.csv", newline='') as report_file:
+            report = list(csv.DictReader(report_file))
+        os.remove("../output_files/LoanStats_securev1_2018Q4 - Sample Incremental - Validation Report.csv")
+        os.remove('LoanStats_securev1_2018Q4 - Sample Incremental.csv')
+        self.assertEqual(first, "../output_files/LoanStats_securev1_2018Q4 - Sample Incremental.parquet")
+        self.assertTrue(isinstance(second, LazyParquet))
+        self.assertEqual(len(second), 24)
+        self.assertEqual(output_files, ["../output_files/LoanStats_securev1_2018Q4 - Sample Incremental.parquet", "../output_files/LoanStats_securev1_2018Q4 - Sample Incremental - Part 1.parquet"])
+        self.assertEqual(len(third), 25)
+        self.assertEqual(third['id'].iloc[-1], 144999999)
+        self.assertEqual(temp_files, [])
+        self.assertIsNone(fourth)
+        self.assertEqual([(i['column'], i['row'], i['value']) for i in report], [('loan_amnt', '26', 'twenty')]) ## The row number in the whole file, not in the appended rows
+        self.assertEqual(csv_to_parquet_module.get_temp_path("Manifest.json"), "Manifest.json." + str(os.getpid()) + ".tmp") ## Two processes never write to the same temporary path
+        for i in output_files + ["../output_files/LoanStats_securev1_2018Q4 - Sample Incremental - Manifest.json"]:
+            os.remove(i)
+        
+    def test_success_metrics_recorded_per_file_and_stage(self): ## Test to see that the per-stage times, per-column times, rows in and out, and memory are recorded for each file and written to the JSON lines sink
+        print("In the test_success_metrics_recorded_per_file_and_stage test case")
+        if os.path.isfile("metrics_test.jsonl"):
+            os.remove("metrics_test.jsonl")
+        metrics = PipelineMetrics(sink="metrics_test.jsonl")
+        try:
+            csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt'],
+                            ['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Empty Schema.txt']], streaming=True, chunk_size=5, metrics=metrics)
+        finally:
+            remove_sample_parquet()
+        with open("metrics_test.jsonl") as sink:
+            sink_lines = sink.read().splitlines()
+        os.remove("metrics_test.jsonl")
+        self.assertEqual(len(metrics.files), 2)
+        self.assertTrue(metrics.files[0].succeeded)
+        self.assertFalse(metrics.files[1].succeeded)
+        self.assertEqual(metrics.files[0].rows_in, 24)
+        self.assertEqual(metrics.files[0].rows_out, 24)
+        self.assertTrue(metrics.files[0].bytes_out > 0)
+        self.assertTrue(set(['read', 'raw_data', 'convert', 'write']) <= set(metrics.files[0].stage_seconds))
+        self.assertEqual(len(metrics.files[0].column_seconds), 13)
+        self.assertIsInstance(metrics.files[0].rss_increase_bytes, int)
+        self.assertGreaterEqual(metrics.files[1].peak_rss_bytes, metrics.files[0].peak_rss_bytes) ## The peak is of the whole process, so it never goes down from one file to the next
+        self.assertEqual([json.loads(i)['csv_file'] for i in sink_lines], ['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Sample.csv'])
+        
+    def test_success_benchmark_generates_schema_shaped_data_and_stores_runs(self): ## Test to see that the benchmark generator writes a LoanStats-shaped .csv file that follows the schema .txt file and that every run of a case is stored in the results file
+        print("In the test_success_benchmark_generates_schema_shaped_data_and_stores_runs test case")
+        case = benchmark.get_case(rows=40, columns=16, null_ratio=0.5, date_format='mixed', junk_header_lines=2, junk_footer_lines=3, schema='LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt', options={'streaming': True, 'chunk_size': 15})
+        runs = benchmark.run_benchmark([case], repeats=2, results_file="benchmark_test.jsonl", label="test", folder=".", isolate=False)
+        csv_path, schema_path = benchmark.get_case_files(case, ".")
+        schema = get_compiled_schema(schema_path)
+        parquet_path = os.path.join("../output_files", os.path.basename(csv_path).split('.csv')[0] + ".parquet")
+        df = pd.read_parquet(parquet_path)
+        with open("benchmark_test.jsonl") as results:
+            stored_runs = [json.loads(i) for i in results.read().splitlines()]
+        comparison = benchmark.compare_results("benchmark_test.jsonl", "test", "test")
+        for i in glob.glob("Benchmark - *") + ["benchmark_test.jsonl", parquet_path]:
+            os.remove(i)
+        self.assertEqual(len(schema), 16)
+        self.assertEqual(list(schema)[13:], ['id_2', 'member_id_2', 'loan_amnt_2'])
+        self.assertEqual(df.shape, (40, 16))
+        self.assertEqual(df['loan_amnt'].isna().sum(), 0) ## Columns that are not nullable never get empty values
+        self.assertTrue(df['emp_title'].isna().sum() > 0)
+        self.assertEqual([(i['label'], i['repeat'], i['succeeded'], i['rows_out']) for i in stored_runs], [("test", 0, True, 40), ("test", 1, True, 40)])
+        self.assertEqual(stored_runs, runs)
+        self.assertEqual([(i['speedup'], i['regression']) for i in comparison], [(1.0, False)])
+        
+    def test_success_data_region_skips_junk_rows_and_keeps_multi_line_values(self): ## Test to see that the header and the junk rows at the end of the file are found from the start and end of the file and that values spanning lines are kept
+        print("In the test_success_data_region_skips_junk_rows_and_keeps_multi_line_values test case")
+        with open('LoanStats_securev1_2018Q4 - Sample.csv', newline='') as csv_file:
+            rows = list(csv.reader(csv_file))
+        data_rows = [i for i in rows[2:] if len(i) == len(rows[1])]
+        data_rows[0][7] = 'Truck\nDriver' ## emp_title of data row 1 spans two lines
+        with open('LoanStats_securev1_2018Q4 - Sample Multi Line.csv', 'w', newline='') as csv_file:
+            csv_file.write('Notes offered by Prospectus (https://www.lendingclub.com/info/prospectus.action)\r\n')
+            csv.writer(csv_file, quoting=csv.QUOTE_ALL).writerows([rows[1]] + data_rows)
+            csv_file.write('\r\nTotal amount funded in policy code 1: 2160700\r\nTotal amount funded in policy code 2: 0\r\n')
+        with open('LoanStats_securev1_2018Q4 - Sample Multi Line.csv', 'rb') as csv_file:
+            content = csv_file.read()
+        region = detect_data_region('LoanStats_securev1_2018Q4 - Sample Multi Line.csv', 400) ## The first 400 bytes end in the middle of a row
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Multi Line.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True)
+        df = pd.read_parquet(result[0])
+        os.remove('LoanStats_securev1_2018Q4 - Sample Multi Line.csv')
+        os.remove(result[0])
+        self.assertEqual(region.header, rows[1])
+        self.assertTrue(content[region.header_end:].startswith(b'"144899438","",'))
+        self.assertEqual(content[region.data_end:], b'\r\nTotal amount funded in policy code 1: 2160700\r\nTotal amount funded in policy code 2: 0\r\n')
+        self.assertEqual(len(df), 24)
+        self.assertEqual(df['emp_title'][0], 'Truck\nDriver')
+        
+    def test_success_data_region_csv_without_header_streaming(self): ## Test to see that a csv file without a header is still read from its first row when the header cannot be found at the start of the file
+        print("In the test_success_data_region_csv_without_header_streaming test case")
+        with open('LoanStats_securev1_2018Q4 - Sample.csv', newline='') as csv_file:
+            rows = list(csv.reader(csv_file))
+        with open('LoanStats_securev1_2018Q4 - Sample No Header.csv', 'w', newline='') as csv_file:
+            csv.writer(csv_file, quoting=csv.QUOTE_ALL).writerows([i for i in rows[2:] if len(i) == len(rows[1])])
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample No Header.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True)
+        df = pd.read_parquet(result[0])
+        os.remove('LoanStats_securev1_2018Q4 - Sample No Header.csv')
+        os.remove(result[0])
+        self.assertEqual(len(df), 24)
+        self.assertEqual(df['id'][0], 144899438)
+        
+    def test_success_parquet_options_row_groups_compression_dictionary_and_statistics(self): ## Test to see that the row group size, compression, and statistics options are used and that only the low-cardinality columns are dictionary-encoded
+        print("In the test_success_parquet_options_row_groups_compression_dictionary_and_statistics test case")
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True, parquet_options={'row_group_size': 10, 'compression': 'zstd', 'compression_level': 5, 'data_page_size': 4096})
+        metadata = pq.ParquetFile(result[0]).metadata
+        os.remove(result[0])
+        columns = metadata.schema.names
+        self.assertEqual([metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)], [10, 10, 4])
+        self.assertEqual(set(metadata.row_group(0).column(i).compression for i in range(len(columns))), {'ZSTD'})
+        self.assertIn('RLE_DICTIONARY', metadata.row_group(0).column(columns.index('grade')).encodings)
+        self.assertNotIn('RLE_DICTIONARY', metadata.row_group(0).column(columns.index('id')).encodings)
+        self.assertEqual(metadata.row_group(0).column(columns.index('id')).statistics.min, 144899438)
+        
+    def test_success_parquet_options_partition_columns(self): ## Test to see that the output is hive-partitioned by the partition columns in the schema and that partition columns not in the schema are ignored
+        print("In the test_success_parquet_options_partition_columns test case")
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True, chunk_size=10, parquet_options={'partition_columns': ['addr_state', 'home_ownership']})
+        partitions = sorted(i for i in os.listdir(result[0]) if os.path.isdir(os.path.join(result[0], i)))
+        partition_files = [len(files) for folder, folders, files in os.walk(result[0]) if len(folders) == 0] ## Every partition is written to one .parquet file even though the csv file is written in chunks of 10 rows
+        df = pd.read_parquet(result[0])
+        shutil.rmtree(result[0])
+        with open('LoanStats_securev1_2018Q4 - Sample.csv', newline='') as csv_file:
+            il_rows = [i for i in csv.reader(csv_file) if len(i) > 10 and i[10] == 'IL']
+        self.assertEqual(partitions, ['addr_state=CA', 'addr_state=FL', 'addr_state=IL', 'addr_state=NY', 'addr_state=TX', 'addr_state=WA'])
+        self.assertEqual(len(partition_files), len(partitions))
+        self.assertEqual(set(partition_files), {1})
+        self.assertEqual(len(df), 24)
+        self.assertEqual(len(df[df['addr_state'] == 'IL']), len(il_rows))
+
+    def test_success_parquet_options_partition_columns_date(self): ## Test to see that a Date partition column is written as YYYY-MM-DD folders and is read back as a Date column
+        print("In the test_success_parquet_options_partition_columns_date test case")
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True, chunk_size=10, parquet_options={'partition_columns': ['issue_d']})
+        partitions = sorted(i for i in os.listdir(result[0]) if os.path.isdir(os.path.join(result[0], i)))
+        lazy = LazyParquet([result[0]])
+        df = lazy.to_pandas()
+        arrow_type = lazy.to_arrow().schema.field('issue_d').type
+        shutil.rmtree(result[0])
+        self.assertTrue(len(partitions) > 0)
+        self.assertEqual([datetime.strptime(i, 'issue_d=%Y-%m-%d').strftime('issue_d=%Y-%m-%d') for i in partitions], partitions)
+        self.assertEqual(len(df), 24)
+        self.assertTrue(is_datetime64_dtype(df['issue_d']))
+        self.assertTrue(pa.types.is_timestamp(arrow_type))
+        
+    def test_success_return_types_only_build_dataframe_when_asked(self): ## Test to see that the converted Arrow table is returned as a DataFrame, a LazyParquet that builds the DataFrame when it is used, a pyarrow Table, or the path of the Parquet table, and that the Parquet table is read back with the same data types
+        print("In the test_success_return_types_only_build_dataframe_when_asked test case")
+        with open('LoanStats_securev1_2018Q4 - Sample.csv', newline='') as csv_file:
+            rows = [i + [''] * (13 - len(i)) for i in csv.reader(csv_file)]
+        table = to_parquet('LoanStats_securev1_2018Q4 - Sample.csv', get_raw_data(rows, rows[1]), get_compiled_schema('LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt'))
+        parquet_path = "../output_files/LoanStats_securev1_2018Q4 - Sample.parquet"
+        df = get_return_value(table, parquet_path, 'pandas')
+        lazy = get_return_value(table, parquet_path, 'lazy')
+        self.assertTrue(isinstance(table, pa.Table))
+        self.assertTrue(pa.types.is_string(table.schema.field('grade').type))
+        self.assertTrue(isinstance(df, pd.DataFrame))
+        self.assertTrue(pd.read_parquet(parquet_path).equals(df))
+        os.remove(parquet_path)
+        self.assertEqual(len(lazy), 24)
+        self.assertIsNone(lazy.df)
+        self.assertTrue(lazy.to_pandas().equals(df))
+        self.assertIs(get_return_value(table, parquet_path, 'arrow'), table)
+        self.assertEqual(get_return_value(table, parquet_path, 'none'), parquet_path)
+        
+    def test_success_csv_readers_return_the_same_data(self): ## Test to see that the python, pyarrow, and pandas csv readers give the same data in memory and in streaming mode, that a file with a data row that has fewer values than the header (even the last data row) is read again by the python reader, and that 'auto' never starts Spark for small files
+        print("In the test_success_csv_readers_return_the_same_data test case")
+        files = [['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']]
+        expected = csv_to_parquet(files, reader='python')[0]
+        with open('LoanStats_securev1_2018Q4 - Sample.csv', newline='') as csv_file:
+            rows = list(csv.reader(csv_file))
+        rows[5] = rows[5][:-1] ## The last value of a data row is missing
+        with open('LoanStats_securev1_2018Q4 - Sample Irregular.csv', 'w', newline='') as csv_file:
+            csv.writer(csv_file).writerows(rows)
+        irregular_files = [['LoanStats_securev1_2018Q4 - Sample Irregular.csv', files[0][1]]]
+        irregular_expected = csv_to_parquet(irregular_files, reader='python')[0]
+        rows = list(csv.reader(open('LoanStats_securev1_2018Q4 - Sample.csv', newline='')))
+        rows[-4] = rows[-4][:-1] ## The last value of the last data row is missing
+        with open('LoanStats_securev1_2018Q4 - Sample Irregular Last Row.csv', 'w', newline='') as csv_file:
+            csv.writer(csv_file).writerows(rows)
+        last_row_files = [['LoanStats_securev1_2018Q4 - Sample Irregular Last Row.csv', files[0][1]]]
+        last_row_expected = csv_to_parquet(last_row_files, reader='python')[0]
+        for reader in ['arrow', 'pandas']:
+            self.assertTrue(csv_to_parquet(files, reader=reader)[0].equals(expected))
+            self.assertTrue(pd.read_parquet(csv_to_parquet(files, streaming=True, chunk_size=5, reader=reader)[0]).equals(expected))
+            self.assertTrue(csv_to_parquet(irregular_files, reader=reader)[0].equals(irregular_expected))
+            self.assertTrue(pd.read_parquet(csv_to_parquet(irregular_files, streaming=True, chunk_size=5, reader=reader)[0]).equals(irregular_expected))
+            self.assertTrue(csv_to_parquet(last_row_files, reader=reader)[0].equals(last_row_expected))
+            self.assertTrue(pd.read_parquet(csv_to_parquet(last_row_files, streaming=True, chunk_size=4, reader=reader)[0]).equals(last_row_expected))
+        for i in ['LoanStats_securev1_2018Q4 - Sample Irregular.csv', "../output_files/LoanStats_securev1_2018Q4 - Sample Irregular.parquet", 'LoanStats_securev1_2018Q4 - Sample Irregular Last Row.csv', "../output_files/LoanStats_securev1_2018Q4 - Sample Irregular Last Row.parquet"]:
+            os.remove(i)
+        self.assertEqual(len(expected), 24)
+        self.assertEqual(len(irregular_expected), 24)
+        self.assertEqual(len(last_row_expected), 24) ## The last data row is not skipped
+        self.assertIn(choose_csv_reader(500*1024*1024, False), ['arrow', 'pandas'])
+        self.assertIn(choose_csv_reader(20*1024*1024*1024, True), ['arrow', 'pandas'])
+        
+    def test_success_session_settings_and_lazy_imports(self): ## Test to see that importing the library and converting a file with the pyarrow reader does not import pyspark, that a ConversionSession keeps its Spark settings and only starts Spark when it is needed, that the memory of its JVM is estimated from its driver memory, and that the cold and warm start times are measured
+        print("In the test_success_session_settings_and_lazy_imports test case")
+        output = subprocess.run([sys.executable, '-c', "import sys; from csv_to_parquet import csv_to_parquet; csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], reader='arrow', return_type='none'); print('pyspark' in sys.modules)"], capture_output=True, text=True)
+        self.assertEqual(output.stdout.splitlines()[-1], 'False')
+        session = ConversionSession(driver_memory='4g', executor_memory='2g', shuffle_partitions=8)
+        self.assertEqual(session.spark_conf, {'spark.driver.memory': '4g', 'spark.executor.memory': '2g', 'spark.sql.shuffle.partitions': 8})
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], reader='pandas', session=session)
+        os.remove("../output_files/LoanStats_securev1_2018Q4 - Sample.parquet")
+        self.assertEqual(len(result[0]), 24)
+        self.assertIsNone(session.spark)
+        self.assertEqual(pickle.loads(pickle.dumps(session)).spark_conf, session.spark_conf)
+        self.assertEqual(csv_to_parquet_module.get_jvm_memory_bytes(session), 4*1024**3 + csv_to_parquet_module.SPARK_JVM_OVERHEAD_BYTES)
+        self.assertEqual(csv_to_parquet_module.get_jvm_memory_bytes(ConversionSession(driver_memory='512m')), 512*1024**2 + csv_to_parquet_module.SPARK_JVM_OVERHEAD_BYTES)
+        self.assertEqual(csv_to_parquet_module.estimate_memory_bytes('LoanStats_securev1_2018Q4 - Sample.csv', {'engine': 'spark', 'session': session}), csv_to_parquet_module.get_jvm_memory_bytes(session)) ## The JVM of the 'spark' engine is counted in the memory budget
+        self.assertIn('imports', session.warm_up())
+        startup = benchmark.measure_startup()
+        self.assertGreater(startup['import_seconds'], 0)
+        self.assertLess(startup['warm_start_seconds'], startup['cold_start_seconds'])
+        
+    def test_success_inferred_schema_for_missing_and_partial_schema(self): ## Test to see that a schema .txt file is inferred from a sample of the rows when the schema .txt file is missing or only has some of the columns, that the columns in the schema .txt file keep their line, and that the csv file can be converted with the inferred schema
+        print("In the test_success_inferred_schema_for_missing_and_partial_schema test case")
+        supplied_schema = parse_schema_txt_file('LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt')
+        inferred_schema_txt = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Missing Schema.txt']], infer_schema='write')[0]
+        with open(inferred_schema_txt, newline='') as schema_file:
+            inferred_content = schema_file.read()
+        inferred_schema = parse_schema_txt_file(inferred_schema_txt)
+        sampled_schema = parse_schema_txt_file(infer_schema('LoanStats_securev1_2018Q4 - Sample.csv', sample_rows=8, full_scan_bytes=0)) ## Only the start of each part of the file is read
+        with open('LoanStats_securev1_2018Q4 - Partial Schema.txt', 'w', newline='') as schema_file:
+            schema_file.write('Field_Name Data_Type Nullability date_standardization\r\ngrade String true\r\nloan_amnt Integer false')
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Partial Schema.txt']], infer_schema='convert')
+        partial_schema = parse_schema_txt_file(inferred_schema_txt)
+        os.remove('LoanStats_securev1_2018Q4 - Partial Schema.txt')
+        os.remove(inferred_schema_txt)
+        os.remove("../output_files/LoanStats_securev1_2018Q4 - Sample.parquet")
+        self.assertTrue(inferred_content.startswith('Field_Name Data_Type Nullability date_standardization\r\nid Integer false\r\n'))
+        self.assertEqual(list(inferred_schema.keys()), list(supplied_schema.keys()))
+        for i in supplied_schema:
+            if i != 'member_id': ## member_id is empty in every row, so it is inferred as a String
+                self.assertEqual(inferred_schema[i][0], supplied_schema[i][0])
+                self.assertEqual(sampled_schema[i][0], supplied_schema[i][0])
+        self.assertEqual(inferred_schema['member_id'], ['String', 'true'])
+        self.assertEqual(inferred_schema['issue_d'], ['Date', 'false', 'true'])
+        self.assertEqual(inferred_schema['emp_title'], ['String', 'true'])
+        self.assertTrue(all(i[1] == 'true' for i in sampled_schema.values())) ## Null values cannot be ruled out without reading every row
+        self.assertEqual(partial_schema['grade'], ['String', 'true'])
+        self.assertEqual(partial_schema['int_rate'], ['String', 'false'])
+        self.assertEqual(len(result[0]), 24)
+        self.assertEqual(len(result[0].columns), 13)
+        
+    def test_success_inferred_schema_eight_digit_integers(self): ## Test to see that a column of 8-digit whole numbers that could be read as YYYYMMDD dates is inferred as an Integer column and that a column of real dates is still inferred as a Date column
+        print("In the test_success_inferred_schema_eight_digit_integers test case")
+        with open('Eight Digit Integers.csv', 'w', newline='') as csv_file:
+            csv.writer(csv_file).writerows([['account_number', 'issue_d'], ['20181205', 'Dec-2018'], ['20190101', 'Jan-2019'], ['20170630', 'Jun-2017'], ['20201231', 'Dec-2020']])
+        inferred_schema_txt = infer_schema('Eight Digit Integers.csv')
+        inferred_schema = parse_schema_txt_file(inferred_schema_txt)
+        os.remove(inferred_schema_txt)
+        os.remove('Eight Digit Integers.csv')
+        self.assertEqual(inferred_schema['account_number'], ['Integer', 'false'])
+        self.assertEqual(inferred_schema['issue_d'][0], 'Date')
+        
+    def test_success_diagnostics_aggregate_rate_limit_and_destinations(self): ## Test to see that the Integer values with a decimal are sent as one warning per column with their number and first row, that the messages are written to the text file, JSON log, and webhook destinations, that the rate limit drops warnings but never errors, and that every warning is written when no rate limit is given
+        print("In the test_success_diagnostics_aggregate_rate_limit_and_destinations test case")
+        rows = list(csv.reader(open('LoanStats_securev1_2018Q4 - Sample.csv', newline='')))
+        for i in [4, 9, 12]: ## loan_amnt of data rows 4, 9, and 12 (data row 6 already has a decimal)
+            rows[i + 1][2] = rows[i + 1][2] + '.0'
+        with open('LoanStats_securev1_2018Q4 - Sample Decimals.csv', 'w', newline='') as csv_file:
+            csv.writer(csv_file, quoting=csv.QUOTE_ALL).writerows(rows)
+        posted = []
+        class WebhookHandler(http.server.BaseHTTPRequestHandler): ## Local stand-in for a webhook
+            def do_POST(self):
+                posted.extend(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+                self.send_response(200)
+                self.end_headers()
+            def log_message(self, *args):
+                pass
+        server = http.server.HTTPServer(('127.0.0.1', 0), WebhookHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        webhook = WebhookDestination('http://127.0.0.1:' + str(server.server_port) + '/')
+        diagnostics = Diagnostics([FileDestination('../output_files/diagnostics.log'), JsonLogDestination('../output_files/diagnostics.jsonl'), webhook])
+        csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Decimals.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True, chunk_size=5, diagnostics=diagnostics)
+        rate_limited = Diagnostics([JsonLogDestination('../output_files/diagnostics - Rate Limited.jsonl')], max_messages_per_second=2)
+        for i in range(10):
+            rate_limited.emit("WARNING: Warning number " + str(i))
+            rate_limited.emit("ERROR: Error number " + str(i))
+        rate_limited.emit("Information", Severity.INFO)
+        unlimited = Diagnostics([JsonLogDestination('../output_files/diagnostics - Unlimited.jsonl')]) ## Rate limiting is off unless max_messages_per_second is given
+        for i in range(300):
+            unlimited.emit("WARNING: Warning number " + str(i))
+        diagnostics.close()
+        rate_limited.close()
+        unlimited.close()
+        server.shutdown()
+        server.server_close()
+        with open('../output_files/diagnostics.log') as log_file:
+            log_lines = log_file.read().splitlines()
+        with open('../output_files/diagnostics.jsonl') as log_file:
+            json_records = [json.loads(i) for i in log_file]
+        with open('../output_files/diagnostics - Rate Limited.jsonl') as log_file:
+            rate_limited_records = [json.loads(i) for i in log_file]
+        with open('../output_files/diagnostics - Unlimited.jsonl') as log_file:
+            unlimited_records = [json.loads(i) for i in log_file]
+        for i in ['LoanStats_securev1_2018Q4 - Sample Decimals.csv', '../output_files/LoanStats_securev1_2018Q4 - Sample Decimals.parquet', '../output_files/diagnostics.log', '../output_files/diagnostics.jsonl', '../output_files/diagnostics - Rate Limited.jsonl', '../output_files/diagnostics - Unlimited.jsonl']:
+            os.remove(i)
+        decimal_records = [i for i in json_records if i.get('column') == 'loan_amnt']
+        self.assertEqual(len(decimal_records), 1)
+        self.assertEqual(decimal_records[0]['severity'], 'WARNING')
+        self.assertEqual(decimal_records[0]['count'], 4)
+        self.assertEqual(decimal_records[0]['first_row'], 4)
+        self.assertEqual(len(decimal_records[0]['sample_values']), 4)
+        self.assertTrue(decimal_records[0]['sample_values'][0].endswith('.0 -> ' + rows[5][2][:-2]))
+        self.assertTrue("has 4 values with a decimal (the first one is in row 4" in decimal_records[0]['message'])
+        self.assertEqual(len(log_lines), len(json_records))
+        self.assertTrue(log_lines[-1].endswith('WARNING ' + decimal_records[0]['message']))
+        self.assertEqual([i['message'] for i in posted], [i['message'] for i in json_records])
+        self.assertEqual(webhook.failed_requests, 0)
+        self.assertEqual(len([i for i in rate_limited_records if i['severity'] == 'ERROR']), 10)
+        self.assertLess(len([i for i in rate_limited_records if i['message'].startswith('WARNING: Warning number')]), 10)
+        self.assertTrue(rate_limited_records[-1].get('summary'))
+        self.assertEqual([i['message'] for i in unlimited_records], ["WARNING: Warning number " + str(i) for i in range(300)])
+        
+    def test_success_only_transient_errors_are_retried(self): ## Test to see that network errors, timeouts, and I/O errors that can go away on their own are retried and that missing files, permission errors, and other OSErrors fail the file at once
+        print("In the test_success_only_transient_errors_are_retried test case")
+        for e in [ConnectionResetError("Connection reset"), TimeoutError("Timed out"), MemoryError(), OSError(errno.EIO, "I/O error"), OSError(errno.ENOSPC, "No space left on device"), BlockingIOError(errno.EAGAIN, "Resource temporarily unavailable"), InterruptedError(errno.EINTR, "Interrupted system call")]:
+            self.assertTrue(csv_to_parquet_module.is_transient_error(e))
+        for e in [FileNotFoundError(errno.ENOENT, "No such file or directory"), PermissionError(errno.EACCES, "Permission denied"), IsADirectoryError(errno.EISDIR, "Is a directory"), OSError(errno.EROFS, "Read-only file system"), OSError("No errno"), ValueError("Not transient")]:
+            self.assertFalse(csv_to_parquet_module.is_transient_error(e))
+        
+    def test_success_batch_journal_resumes_and_retries_transient_failures(self): ## Test to see that every file of a batch is recorded in the journal, that a batch run again with the same journal only processes the files that were not completed or changed, that transient failures and worker processes that die are retried, and that temporary outputs left by killed processes are removed
+        print("In the test_success_batch_journal_resumes_and_retries_transient_failures test case")
+        journal_path = "../output_files/Batch Journal.jsonl"
+        sample = ['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']
+        empty = ['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Empty Schema.txt']
+        shutil.copy(sample[0], 'LoanStats_securev1_2018Q4 - Sample Copy.csv')
+        copy = ['LoanStats_securev1_2018Q4 - Sample Copy.csv', sample[1]]
+        with open("../output_files/LoanStats_securev1_2018Q4 - Sample.parquet.999999999.tmp", 'w') as stale_file: ## Left behind by a process that was killed while writing
+            stale_file.write('partial')
+        first_run = csv_to_parquet([sample, empty], journal=journal_path)
+        stale_removed = not os.path.exists("../output_files/LoanStats_securev1_2018Q4 - Sample.parquet.999999999.tmp")
+        process_file = csv_to_parquet_module.process_file
+        calls = []
+        def flaky_process_file(file, options): ## The first call fails with a transient error and the file with the empty schema .txt file fails once with an error that is not transient
+            calls.append(file[0])
+            if len(calls) == 1:
+                raise ConnectionError("Connection reset")
+            if file[1] == empty[1] and len(calls) == 3:
+                raise ValueError("Not transient")
+            return process_file(file, options)
+        csv_to_parquet_module.process_file = flaky_process_file
+        csv_to_parquet_module.BATCH_RETRY_BACKOFF_SECONDS = 0
+        try:
+            second_run = csv_to_parquet([sample, copy, empty], journal=journal_path)
+            second_run_types = [type(i) for i in second_run]
+            second_run_lengths = [len(i) for i in second_run[:2]]
+            third_run = csv_to_parquet([sample, copy, empty], journal=journal_path, return_type='none')
+            crash_marker = "../output_files/crash marker"
+            open(crash_marker, 'w').close()
+            def crashing_process_file(file, options): ## The first worker process to get a file dies, like a worker killed for using too much memory
+                try:
+                    os.remove(crash_marker)
+                except FileNotFoundError: ## The crash marker was already taken by the other worker process
+                    return process_file(file, options)
+                os._exit(1)
+            csv_to_parquet_module.process_file = crashing_process_file
+            os.utime(copy[0]) ## The csv file changed, so it is processed again
+            crash_run = csv_to_parquet([sample, copy, empty], journal=journal_path, workers=2, return_type='none')
+        finally:
+            csv_to_parquet_module.process_file = process_file
+            csv_to_parquet_module.BATCH_RETRY_BACKOFF_SECONDS = 1
+        with open(journal_path) as journal_file:
+            entries = [json.loads(i) for i in journal_file]
+        leftover_temp_files = glob.glob("../output_files/*.tmp")
+        for i in [journal_path, 'LoanStats_securev1_2018Q4 - Sample Copy.csv', "../output_files/LoanStats_securev1_2018Q4 - Sample.parquet", "../output_files/LoanStats_securev1_2018Q4 - Sample Copy.parquet"]:
+            os.remove(i)
+        self.assertTrue(stale_removed)
+        self.assertEqual(leftover_temp_files, [])
+        self.assertEqual(len(first_run[0]), 24)
+        self.assertIsNone(first_run[1])
+        self.assertEqual([(i['csv_file'], i['status'], i['attempts']) for i in entries[:2]], [(sample[0], 'completed', 1), (empty[0], 'failed', 1)])
+        self.assertTrue('is empty' in entries[1]['reason'])
+        self.assertEqual(entries[0]['outputs'], ["../output_files/LoanStats_securev1_2018Q4 - Sample.parquet"])
+        self.assertEqual(second_run_types[:2], [LazyParquet, pd.DataFrame]) ## The first file was completed by the first run
+        self.assertEqual(second_run_lengths, [24, 24])
+        self.assertEqual(calls[:3], [copy[0], copy[0], empty[0]]) ## Only the files that were not completed are processed
+        self.assertEqual([(i['csv_file'], i['schema_file'], i['status'], i['attempts']) for i in entries[2:5]], [(sample[0], sample[1], 'skipped', 0), (copy[0], copy[1], 'completed', 2), (empty[0], empty[1], 'failed', 1)])
+        self.assertEqual(entries[4]['reason'], "ValueError('Not transient')")
+        self.assertEqual(third_run[:2], ["../output_files/LoanStats_securev1_2018Q4 - Sample.parquet", "../output_files/LoanStats_securev1_2018Q4 - Sample Copy.parquet"])
+        self.assertEqual(calls[3:], [empty[0]]) ## Failed files are processed again, completed files are not
+        self.assertEqual(crash_run[1], "../output_files/LoanStats_securev1_2018Q4 - Sample Copy.parquet")
+        self.assertIsNone(crash_run[2])
+        self.assertEqual([(i['csv_file'], i['schema_file'], i['status']) for i in entries[8:]], [(sample[0], sample[1], 'skipped'), (copy[0], copy[1], 'completed'), (empty[0], empty[1], 'failed')] if entries[9]['csv_file'] == copy[0] else [(sample[0], sample[1], 'skipped'), (empty[0], empty[1], 'failed'), (copy[0], copy[1], 'completed')])
+        
+    def test_success_projection_and_row_filters_during_read(self): ## Test to see that only the columns in the schema .txt file are parsed (plus two columns that are always filled, to find the empty rows), that a data row that is empty in every column of the schema is kept (even after the first 64 KB, where the columns parsed to find the empty rows can be empty too), that the rows that do not match the row filters are removed while the file is read in memory and in streaming mode, and that the validation report keeps the row numbers of the whole file
+        print("In the test_success_projection_and_row_filters_during_read test case")
+        sample = ['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']
+        row_filters = [('issue_d', '>=', '2018-11-01'), ('loan_status', 'in', ['Current', 'Fully Paid'])]
+        region = detect_data_region(sample[0])
+        full_result = csv_to_parquet([sample])[0]
+        three_columns = csv_to_parquet([[sample[0], 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Three Columns.txt']], reader='arrow')[0]
+        raw_table = next(read_arrow_tables(sample[0], region.width, region.header_end, region.data_end, None, [0, 2]))
+        filtered_results = [csv_to_parquet([sample], filters=row_filters, reader=i)[0] for i in ['python', 'arrow', 'pandas']]
+        streamed_result = pd.read_parquet(csv_to_parquet([sample], filters=row_filters, streaming=True, chunk_size=5)[0])
+        bad_filters = csv_to_parquet([sample], filters=[('grade', 'like', 'A')]) + csv_to_parquet([sample], filters=[('total_pymnt', '>', 0)])
+        write_sample_with_violations()
+        report_result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Violations.csv', sample[1]]], validation='report', filters=[('grade', '==', 'G')])
+        with open("../output_files/LoanStats_securev1_2018Q4 - Sample Violations - Validation Report.csv", newline='') as report_file:
+            report = list(csv.DictReader(report_file))
+        os.remove('LoanStats_securev1_2018Q4 - Sample Violations.csv')
+        os.remove("../output_files/LoanStats_securev1_2018Q4 - Sample Violations - Validation Report.csv")
+        os.remove("../output_files/LoanStats_securev1_2018Q4 - Sample.parquet")
+        rows = list(csv.reader(open('LoanStats_securev1_2018Q4 - Sample.csv', newline='')))
+        rows[6][7] = '' ## emp_title of data row 5, so the row is empty in every column of the schema below (member_id is always empty)
+        with open('LoanStats_securev1_2018Q4 - Sample Sparse.csv', 'w', newline='') as csv_file:
+            csv.writer(csv_file, quoting=csv.QUOTE_ALL).writerows(rows)
+        open('Sparse Schema Test.txt', 'w').write("Field_Name Data_Type Nullability date_standardization\nmember_id Integer true\nemp_title String true")
+        sparse_results = [csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Sparse.csv', 'Sparse Schema Test.txt']], reader=i)[0] for i in ['python', 'arrow', 'pandas']]
+        sparse_results.append(pd.read_parquet(csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Sparse.csv', 'Sparse Schema Test.txt']], streaming=True, chunk_size=5)[0]))
+        data_rows = [i for i in rows[2:] if len(i) > 1]
+        late_rows = [rows[1]] + [[str(200000000 + i)] + data_rows[i % len(data_rows)][1:] for i in range(2400)]
+        late_rows[2000][0] = late_rows[2000][2] = '' ## id and loan_amnt (the columns parsed to find the empty rows) are empty in a row after the first 64 KB
+        with open('LoanStats_securev1_2018Q4 - Sample Late Sparse.csv', 'w', newline='') as csv_file:
+            csv.writer(csv_file, quoting=csv.QUOTE_ALL).writerows(late_rows)
+        open('Late Sparse Schema Test.txt', 'w').write("Field_Name Data_Type Nullability date_standardization\nmember_id Integer true")
+        late_results = [csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Late Sparse.csv', 'Late Sparse Schema Test.txt']], reader=i)[0] for i in ['python', 'arrow', 'pandas']]
+        late_results += [pd.read_parquet(csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Late Sparse.csv', 'Late Sparse Schema Test.txt']], streaming=True, chunk_size=500, reader=i)[0]) for i in ['python', 'arrow', 'pandas']]
+        late_size = os.path.getsize('LoanStats_securev1_2018Q4 - Sample Late Sparse.csv')
+        for i in ['LoanStats_securev1_2018Q4 - Sample Sparse.csv', 'Sparse Schema Test.txt', "../output_files/LoanStats_securev1_2018Q4 - Sample Sparse.parquet", 'LoanStats_securev1_2018Q4 - Sample Late Sparse.csv', 'Late Sparse Schema Test.txt', "../output_files/LoanStats_securev1_2018Q4 - Sample Late Sparse.parquet"]:
+            os.remove(i)
+        self.assertEqual(get_projection(region.header, ['member_id', 'loan_amnt'], region), [0, 1, 2]) ## loan_amnt and id are filled in every row, so the empty rows can be found
+        self.assertEqual(get_projection(region.header, ['member_id'], region), [0, 1, 2]) ## member_id is empty in every row, so id and loan_amnt are also parsed
+        self.assertEqual(get_projection(region.header, ['id', 'loan_amnt', 'term'], region), [0, 2, 3])
+        self.assertEqual(get_projection(region.header, region.header, region), None)
+        self.assertEqual(raw_table.column_names, ['0', '2'])
+        self.assertEqual(raw_table.num_rows, 24)
+        self.assertEqual(list(three_columns.columns), ['id', 'member_id', 'loan_amnt'])
+        self.assertEqual(three_columns['loan_amnt'].tolist(), full_result['loan_amnt'].tolist())
+        expected = full_result[(full_result['issue_d'] >= '2018-11-01') & full_result['loan_status'].isin(['Current', 'Fully Paid'])].reset_index(drop=True)
+        self.assertTrue(0 < len(expected) < len(full_result))
+        for i in filtered_results + [streamed_result]:
+            pd.testing.assert_frame_equal(i, expected)
+        for i in sparse_results: ## The data row that is empty in every column of the schema is kept
+            self.assertEqual(len(i), 24)
+            self.assertTrue(pd.isna(i['emp_title'][4]))
+        self.assertGreater(late_size, 64*1024)
+        for i in late_results: ## The data row is kept even though the columns parsed to find the empty rows are empty in it
+            self.assertEqual(len(i), 2400)
+        self.assertEqual(bad_filters, [None, None])
+        self.assertEqual(report_result, [None])
+        self.assertEqual([(i['column'], i['row'], i['value']) for i in report], [('loan_amnt', '20', 'ten thousand')]) ## Data row 3 has violations too, but its grade is not 'G'
+        
+    def test_success_spark_engine_matches_pandas_engine(self): ## Test to see that the Parquet table written by the Spark executors has the same data as the one written by the pandas engine and that the validation report has the same row numbers
+        print("In the test_success_spark_engine_matches_pandas_engine test case")
+        pandas_result = pd.read_parquet(csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], streaming=True)[0])
+        spark_result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], engine='spark')[0]
+        spark_result = spark_result.orderBy('id').toPandas()
+        self.assertEqual(list(spark_result.columns), list(pandas_result.columns))
+        self.assertEqual(spark_result['loan_amnt'].tolist(), pandas_result['loan_amnt'].tolist())
+        self.assertEqual(spark_result['issue_d'].tolist(), pandas_result['issue_d'].tolist())
+        write_sample_with_violations()
+        result = csv_to_parquet([['LoanStats_securev1_2018Q4 - Sample Violations.csv', 'LoanStats_securev1_2018Q4 - Developer Supplied Schema - Sample.txt']], engine='spark', validation='report')
+        os.remove('LoanStats_securev1_2018Q4 - Sample Violations.csv')
+        self.assertEqual(result[0], None)
+        report = pd.read_csv("../output_files/LoanStats_securev1_2018Q4 - Sample Violations - Validation Report.csv", dtype=str)
+        os.remove("../output_files/LoanStats_securev1_2018Q4 - Sample Violations - Validation Report.csv")
+        self.assertEqual(report[['column', 'row']].values.tolist(), [['loan_amnt', '3'], ['loan_status', '3'], ['loan_amnt', '20']]) ## The same row numbers as the pandas engine
+        
         
 if __name__ == '__main__':
     test = Test_csv_to_parquet()
@@ -211,4 +813,31 @@ if __name__ == '__main__':
     test.test_error_parquet_not_created_no_header_in_csv_schema_has_less_columns()
     test.test_error_none_returned_schema_mismatch_nullability()
     test.test_error_parquet_not_created_schema_mismatch_nullability()
-    test.test_success_dataframe_columns_match_with_schema()
\ No newline at end of file
+    test.test_success_dataframe_columns_match_with_schema()
+    test.test_success_parquet_created_streaming()
+    test.test_success_streaming_chunk_size_does_not_change_data()
+    test.test_success_convert_column_matches_get_column_values()
+    test.test_error_convert_column_reports_first_invalid_value()
+    test.test_success_convert_column_standardizes_dates_like_get_column_values()
+    test.test_success_parallel_results_in_files_list_order()
+    test.test_error_parquet_not_created_validation_fail_fast()
+    test.test_error_validation_report_lists_every_violation()
+    test.test_success_compiled_schema_is_cached_until_schema_changes()
+    test.test_success_incremental_skips_unchanged_and_appends_new_rows()
+    test.test_success_metrics_recorded_per_file_and_stage()
+    test.test_success_benchmark_generates_schema_shaped_data_and_stores_runs()
+    test.test_success_data_region_skips_junk_rows_and_keeps_multi_line_values()
+    test.test_success_data_region_csv_without_header_streaming()
+    test.test_success_parquet_options_row_groups_compression_dictionary_and_statistics()
+    test.test_success_parquet_options_partition_columns()
+    test.test_success_parquet_options_partition_columns_date()
+    test.test_success_return_types_only_build_dataframe_when_asked()
+    test.test_success_csv_readers_return_the_same_data()
+    test.test_success_session_settings_and_lazy_imports()
+    test.test_success_inferred_schema_for_missing_and_partial_schema()
+    test.test_success_inferred_schema_eight_digit_integers()
+    test.test_success_diagnostics_aggregate_rate_limit_and_destinations()
+    test.test_success_only_transient_errors_are_retried()
+    test.test_success_batch_journal_resumes_and_retries_transient_failures()
+    test.test_success_projection_and_row_filters_during_read()
+    test.test_success_spark_engine_matches_pandas_engine()
\ No newline at end of file